@@ -0,0 +1,32 @@
+import argparse
+import logging
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from logreef.persistence import params
+from logreef.persistence.database import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rebuild the param_daily_stats rollup from param_values"
+    )
+    parser.add_argument("--user-id", type=int, help="only rebuild this user")
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        n_rows = params.backfill_daily_stats(db, args.user_id)
+        logger.info(
+            f"{n_rows} daily row(s) written in {time.perf_counter() - start:.1f} s"
+        )
+    finally:
+        db.close()
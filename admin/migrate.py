@@ -0,0 +1,29 @@
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from logreef.persistence import migrations
+from logreef.persistence.database import engine
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--list", action="store_true", help="only list migrations")
+
+    args = parser.parse_args()
+
+    if args.list:
+        applied = migrations.get_applied(engine)
+        for version, name, _ in migrations.get_migrations():
+            status = "applied" if version in applied else "pending"
+            logger.info(f"{version:04d}_{name}: {status}")
+    else:
+        applied = migrations.apply(engine)
+        logger.info(f"{len(applied)} migration(s) applied")
@@ -0,0 +1,59 @@
+import argparse
+import logging
+import random
+import time
+
+from logreef.config import ParamTypes, TestKits, get_param_type, get_test_kit
+from logreef.units.converter import convert_unit_for
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAIRS = [
+    ("alkalinity", "salifert_alkalinity"),
+    ("alkalinity", "generic_dkh"),
+    ("phosphate", "hanna_phosphorus_ulr"),
+    ("calcium", "generic_calcium_ppm"),
+]
+
+
+def get_param_type_scan(param_type_name: str) -> ParamTypes:
+    # previous implementation, scans every member on each call
+    names = [p.name for p in ParamTypes if p.value == param_type_name]
+    if len(names) != 1:
+        raise Exception(f"{param_type_name} not supported")
+    return ParamTypes[names[0]]
+
+
+def get_test_kit_scan(test_kit_name: str) -> TestKits:
+    names = [t.name for t in TestKits if t.value == test_kit_name]
+    if len(names) != 1:
+        raise Exception(f"{test_kit_name} not supported")
+    return TestKits[names[0]]
+
+
+def per_row(rows, values, get_param_type, get_test_kit) -> float:
+    start = time.perf_counter()
+    for (param_type_name, test_kit_name), value in zip(rows, values):
+        convert_unit_for(
+            get_param_type(param_type_name), get_test_kit(test_kit_name), value
+        )
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", default=1_000_000, type=int)
+    args = parser.parse_args()
+
+    rows = [random.choice(PAIRS) for _ in range(args.n)]
+    values = [random.uniform(0, 10) for _ in range(args.n)]
+
+    for name, elapsed in [
+        (
+            "per row, enum scan",
+            per_row(rows, values, get_param_type_scan, get_test_kit_scan),
+        ),
+        ("per row, enum map ", per_row(rows, values, get_param_type, get_test_kit)),
+    ]:
+        logger.info(f"{name} {args.n} conversions: {elapsed:7.3f} s")
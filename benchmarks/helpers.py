@@ -0,0 +1,40 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from logreef.persistence import users, aquariums, models
+from logreef.utils import get_random_string
+
+
+def seed(
+    db: Session, n_per_type: int, param_type_names: list[str] = ("alkalinity",)
+) -> tuple[models.User, models.Aquarium]:
+    """Create a bench user and aquarium with 'n_per_type' hourly readings of
+    each of 'param_type_names', measured with their default test kit"""
+    user = users.create(
+        db,
+        get_random_string(10),
+        email=get_random_string(10) + "@bench.com",
+        verified=True,
+    )
+    aquarium = aquariums.create(db, user.id, "bench")
+    db.execute(
+        text(
+            """
+            INSERT INTO param_values (user_id, aquarium_id, param_type_name, test_kit_name, value, timestamp)
+            SELECT :user_id, :aquarium_id, test_kits.param_type_name, test_kits.name, random() * 10,
+                NOW() - (i || ' hours')::INTERVAL
+            FROM generate_series(1, :n) AS i
+            JOIN test_kits ON test_kits.is_default
+                AND test_kits.param_type_name = ANY(:param_type_names)
+            """
+        ),
+        {
+            "user_id": user.id,
+            "aquarium_id": aquarium.id,
+            "param_type_names": list(param_type_names),
+            "n": n_per_type,
+        },
+    )
+    db.commit()
+    db.execute(text("ANALYZE param_values"))
+    return user, aquarium
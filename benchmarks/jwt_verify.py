@@ -0,0 +1,32 @@
+import argparse
+import logging
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from logreef.security import create_access_token, get_payload_from_token, token_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def tokens_per_second(n: int, cached: bool) -> float:
+    token, _ = create_access_token({"username": "bench", "email": "bench@bench.com"})
+    token_cache.clear()
+    start = time.perf_counter()
+    for _ in range(n):
+        if not cached:
+            token_cache.clear()
+        get_payload_from_token(token)
+    return n / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", default=20000, type=int)
+    args = parser.parse_args()
+
+    logger.info(f"no cache: {tokens_per_second(args.n, cached=False):10.0f} tokens/s")
+    logger.info(f"cache:    {tokens_per_second(args.n, cached=True):10.0f} tokens/s")
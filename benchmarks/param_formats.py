@@ -0,0 +1,65 @@
+import argparse
+import json
+import logging
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.helpers import seed
+from logreef.persistence import params
+from logreef.persistence.database import SessionLocal, delete_from_db
+
+logging.getLogger("passlib").setLevel(logging.ERROR)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def measure(fn, repeat: int) -> tuple[float, float, int]:
+    """median build and serialization times in ms, and payload size in bytes"""
+    build_times, serialize_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = fn()
+        build_times.append(time.perf_counter() - start)
+
+        # what FastAPI does with a returned model or dict
+        start = time.perf_counter()
+        payload = json.dumps(jsonable_encoder(content)).encode()
+        serialize_times.append(time.perf_counter() - start)
+    return (
+        statistics.median(build_times) * 1000,
+        statistics.median(serialize_times) * 1000,
+        len(payload),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", default=20000, type=int)
+    parser.add_argument("--repeat", default=5, type=int)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, aquarium = seed(db, args.n)
+    try:
+        for name, get_by_type in [
+            ("objects", params.get_by_type),
+            ("columnar", params.get_by_type_columnar),
+        ]:
+            build, serialize, size = measure(
+                lambda: get_by_type(db, user.id, aquarium.name, "alkalinity"),
+                args.repeat,
+            )
+            logger.info(
+                f"{name:8s} n={args.n}: query+build {build:8.1f} ms, "
+                f"serialize {serialize:8.1f} ms, payload {size / 1024:8.0f} KB"
+            )
+    finally:
+        delete_from_db(db, user)
+        db.close()
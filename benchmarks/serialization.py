@@ -0,0 +1,74 @@
+import argparse
+import json
+import logging
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.helpers import seed
+from logreef import schemas, summary
+from logreef.persistence import params, events
+from logreef.persistence.database import SessionLocal, delete_from_db
+from logreef.responses import dumps
+
+logging.getLogger("passlib").setLevel(logging.ERROR)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def seed_with_water_changes(db, n_params: int, n_water_changes: int):
+    user, aquarium = seed(db, n_params // 3, ["alkalinity", "calcium", "magnesium"])
+    for _ in range(n_water_changes):
+        events.create_water_change(db, user.id, aquarium.id, "L", 20)
+    return user, aquarium
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-params", default=10000, type=int)
+    parser.add_argument("--n-water-changes", default=500, type=int)
+    parser.add_argument("--repeat", default=5, type=int)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, aquarium = seed_with_water_changes(db, args.n_params, args.n_water_changes)
+    try:
+        # response content of each endpoint, as returned by its route
+        endpoints = {
+            "GET /params/": params.get_by_type(db, user.id, aquarium.name),
+            "GET /params/?format=columnar": params.get_by_type_columnar(
+                db, user.id, aquarium.name
+            ),
+            "GET /summary/": summary.get_for_all(db, user.id, aquarium.name),
+            "GET /events/waterchange/": [
+                schemas.EventWaterChange.convert(event)
+                for event in events.get_water_changes(db, user.id)
+            ],
+        }
+        for name, content in endpoints.items():
+            before = median_ms(
+                lambda: json.dumps(jsonable_encoder(content)).encode(), args.repeat
+            )
+            after = median_ms(lambda: dumps(content), args.repeat)
+            logger.info(
+                f"{name:30s} jsonable_encoder+json {before:9.3f} ms, "
+                f"orjson {after:9.3f} ms ({before / after:5.1f}x)"
+            )
+    finally:
+        delete_from_db(db, user)
+        db.close()
@@ -0,0 +1,81 @@
+import argparse
+import logging
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.helpers import seed
+from logreef import summary
+from logreef.config import ParamTypes
+from logreef.persistence import params
+from logreef.persistence.database import SessionLocal, delete_from_db
+
+logging.getLogger("passlib").setLevel(logging.ERROR)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def get_for_all_per_type(db, user_id: int, aquarium_name: str):
+    # previous implementation: 1 + 2N round trips
+    out = {}
+    for param_type in params.get_type_by_user(db, user_id, aquarium_name):
+        last = params.get_by_type(db, user_id, aquarium_name, param_type, limit=2)
+        stats = params.get_stats_by_type_last_n_days(
+            db, user_id, aquarium_name, param_type, 7
+        )
+        out[param_type] = (last, stats)
+    return out
+
+
+def timeit(fn, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    logger.info(
+        f"{name:<12} median {statistics.median(timings):7.2f} ms"
+        f" | p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", default=5000, type=int, help="readings per param type")
+    parser.add_argument("--repeat", default=100, type=int)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, aquarium = seed(db, args.n, [param_type.value for param_type in ParamTypes])
+    try:
+        report(
+            "per type",
+            timeit(
+                lambda: get_for_all_per_type(db, user.id, aquarium.name), args.repeat
+            ),
+        )
+        report(
+            "single query",
+            timeit(
+                lambda: (
+                    params.summary_cache.clear(),
+                    summary.get_for_all(db, user.id, aquarium.name),
+                ),
+                args.repeat,
+            ),
+        )
+        report(
+            "cached",
+            timeit(lambda: summary.get_for_all(db, user.id, aquarium.name), args.repeat),
+        )
+    finally:
+        delete_from_db(db, user)
+        db.close()
@@ -0,0 +1,56 @@
+import argparse
+import logging
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.helpers import seed
+from logreef import summary
+from logreef.persistence import params
+from logreef.persistence.database import SessionLocal, delete_from_db
+
+logging.getLogger("passlib").setLevel(logging.ERROR)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", default=10_000, type=int, help="readings in the series")
+    parser.add_argument("--repeat", default=50, type=int)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    # hourly readings, the month window covers 720 of them
+    user, aquarium = seed(db, args.n)
+    try:
+        cases = {
+            "no windows": lambda: params.get_summary_by_type(
+                db, user.id, aquarium.name, n_last=2, n_days=7
+            ),
+            "windows": lambda: params.get_summary_by_type(
+                db, user.id, aquarium.name, n_last=2, n_days=7, windows=summary.WINDOWS
+            ),
+        }
+        # the time-weighted stats of a cached summary, at read time
+        cached = cases["windows"]()["alkalinity"]
+        cases["read time"] = lambda: summary._build_summary(cached)
+
+        # interleaved, the timings of the db drift over a run
+        timings = {name: [] for name in cases}
+        for _ in range(args.repeat):
+            for name, fn in cases.items():
+                start = time.perf_counter()
+                fn()
+                timings[name].append((time.perf_counter() - start) * 1000)
+        for name, elapsed in timings.items():
+            logger.info(
+                f"{name:<10} {args.n} readings: median {statistics.median(elapsed):8.3f} ms"
+            )
+    finally:
+        delete_from_db(db, user)
+        db.close()
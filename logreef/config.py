@@ -31,6 +31,23 @@ class ConfigAPI(Enum):
     ACCESS_TOKEN_EXPIRE_MINUTES = "ACCESS_TOKEN_EXPIRE_MINUTES"
     STORAGE_CONNECTION_STRING = "STORAGE_CONNECTION_STRING"
     SUPABASE_AUTH_SECRET = "SUPABASE_AUTH_SECRET"
+    USER_CACHE_TTL_SECONDS = "USER_CACHE_TTL_SECONDS"
+    USER_CACHE_MAX_SIZE = "USER_CACHE_MAX_SIZE"
+    TOKEN_CACHE_TTL_SECONDS = "TOKEN_CACHE_TTL_SECONDS"
+    TOKEN_CACHE_MAX_SIZE = "TOKEN_CACHE_MAX_SIZE"
+    SUMMARY_CACHE_TTL_SECONDS = "SUMMARY_CACHE_TTL_SECONDS"
+    SUMMARY_CACHE_MAX_SIZE = "SUMMARY_CACHE_MAX_SIZE"
+    PASSWORD_POOL_WORKERS = "PASSWORD_POOL_WORKERS"
+    PASSWORD_POOL_MAX_PENDING = "PASSWORD_POOL_MAX_PENDING"
+    DB_POOL_SIZE = "DB_POOL_SIZE"
+    DB_MAX_OVERFLOW = "DB_MAX_OVERFLOW"
+    DB_POOL_TIMEOUT = "DB_POOL_TIMEOUT"
+    DB_POOL_RECYCLE = "DB_POOL_RECYCLE"
+    DB_POOL_PRE_PING = "DB_POOL_PRE_PING"
+    DB_STATEMENT_TIMEOUT_MS = "DB_STATEMENT_TIMEOUT_MS"
+    DB_PGBOUNCER = "DB_PGBOUNCER"
+    SLOW_QUERY_MS = "SLOW_QUERY_MS"
+    METRICS_TOKEN = "METRICS_TOKEN"
 
 
 default_test_kits = {
@@ -43,26 +60,33 @@ default_test_kits = {
 }
 
 
+_param_types_by_value = {param_type.value: param_type for param_type in ParamTypes}
+_test_kits_by_value = {test_kit.value: test_kit for test_kit in TestKits}
+
+
 def get_param_type(param_type_name: str) -> ParamTypes:
-    param_type_names = [
-        param_type.name
-        for param_type in ParamTypes
-        if param_type.value == param_type_name
-    ]
-    if len(param_type_names) != 1:
+    param_type = _param_types_by_value.get(param_type_name)
+    if param_type is None:
         raise Exception(f"{param_type_name} not supported")
-    return ParamTypes[param_type_names[0]]
+    return param_type
 
 
 def get_test_kit(test_kit_name: str) -> TestKits:
-    test_kit_names = [
-        test_kit.name for test_kit in TestKits if test_kit.value == test_kit_name
-    ]
-    if len(test_kit_names) != 1:
+    test_kit = _test_kits_by_value.get(test_kit_name)
+    if test_kit is None:
         raise Exception(f"{test_kit_name} not supported")
-    return TestKits[test_kit_names[0]]
+    return test_kit
+
+
+def get_config_flag(config: ConfigAPI, default: bool = False) -> bool:
+    value = get_config(config, "")
+    if value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
 
-def get_config(config: ConfigAPI):
+def get_config(config: ConfigAPI, default=None):
     name = config.value
+    if default is not None:
+        return os.environ.get(name, default)
     return os.environ[name]
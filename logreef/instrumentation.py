@@ -0,0 +1,110 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event, Engine
+
+from logreef.config import get_config, ConfigAPI
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(get_config(ConfigAPI.SLOW_QUERY_MS, 500))
+N_SLOWEST = 3
+
+
+class QueryStats:
+    """Statements sent to the db while tracking, e.g. during one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_secs = 0.0
+        # (duration in secs, statement), longest first
+        self.slowest: list[tuple[float, str]] = []
+
+    def record(self, statement: str, secs: float):
+        self.count += 1
+        self.total_secs += secs
+        if len(self.slowest) < N_SLOWEST or secs > self.slowest[-1][0]:
+            self.slowest.append((secs, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[N_SLOWEST:]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: total and slowest statement durations"""
+        metrics = [f'db;dur={self.total_secs * 1000:.2f};desc="{self.count} queries"']
+        if self.slowest:
+            metrics.append(f"db-slowest;dur={self.slowest[0][0] * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Record the statements executed in this context (threads and tasks
+    started from it included) in the yielded stats"""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    secs = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, secs)
+    if secs * 1000 >= SLOW_QUERY_MS:
+        # no parameters, they can hold user data
+        statement = " ".join(statement.split())
+        logger.warning(f"Slow query ({secs * 1000:.0f} ms): {statement}")
+
+
+def _handle_error(context):
+    # after_cursor_execute isn't called for a failed statement. Errors raised
+    # before the statement was sent have no execution context.
+    if context.execution_context is not None and context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument(engine: Engine):
+    """Time every statement of 'engine' (the sync_engine of an async engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Adds the db statement count and durations of each request to its
+    Server-Timing response header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
@@ -1,28 +1,50 @@
 from typing import Annotated
+from contextlib import asynccontextmanager
+import hmac
 import logging
 from datetime import datetime, timezone
 
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBearer,
+    OAuth2PasswordRequestForm,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.datastructures import Default
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
 from logreef import schemas, __version__
-from logreef.persistence import users, testkits, events, messages
-from logreef.user import get_current_user, get_me
+from logreef.persistence import users, messages, catalog
+from logreef.user import get_current_user_async, get_me_async
 from logreef import summary
-from logreef.persistence.database import get_session
+from logreef.persistence.database import (
+    get_session,
+    get_async_session,
+    SessionLocal,
+    engine,
+    async_engine,
+    AsyncSession,
+)
+from logreef.persistence import migrations
+from logreef.persistence.params import summary_cache
 from logreef.security import (
     create_access_token,
     verify_email_token,
     create_email_confirmation_token,
     send_confirmation_email,
-    get_payload_from_supabase_token
+    get_payload_from_supabase_token,
+    shutdown_password_pool,
+    PasswordPoolSaturated,
+    token_cache,
 )
-from logreef.user import get_current_user, get_me
 from logreef.register import register_user
-from logreef.routers import admin, params, aquariums
+from logreef.responses import ORJSONResponse, etag_matches
+from logreef.instrumentation import QueryStatsMiddleware
+from logreef import metrics
+from logreef.routers import admin, params, aquariums, events
 from logreef.config import ConfigAPI, get_config
 
 load_dotenv()
@@ -30,12 +52,42 @@ load_dotenv()
 logging.getLogger("passlib").setLevel(logging.ERROR)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    applied = migrations.apply(engine)
+    if applied:
+        logger.info(f"Applied migrations: {', '.join(applied)}")
+    db = SessionLocal()
+    try:
+        logger.info(f"Loaded catalog version {catalog.load(db).version}")
+    finally:
+        db.close()
+    yield
+    shutdown_password_pool()
+    await async_engine.dispose()
+
+
+# as a default (placeholder), routes with a 'response_model' keep serializing
+# through pydantic directly, the others render with orjson
+app = FastAPI(lifespan=lifespan, default_response_class=Default(ORJSONResponse))
 app.include_router(admin.router, prefix="/admin")
 app.include_router(params.router, prefix="/params")
 app.include_router(aquariums.router, prefix="/aquariums")
+app.include_router(events.router, prefix="/events")
 
 
+metrics.register_engines({"sync": engine, "async": async_engine.sync_engine})
+metrics.register_caches(
+    {
+        "users": users.user_cache,
+        "tokens": token_cache,
+        "summaries": summary_cache,
+    }
+)
+
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -45,17 +97,53 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(PasswordPoolSaturated)
+def password_pool_saturated_handler(request: Request, ex: PasswordPoolSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many login attempts, please try again."},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/")
 def read_root():
     return {"api": "logreef", "version": __version__, "db": get_config(ConfigAPI.DB_URL)}
 
 
+metrics_bearer = HTTPBearer(auto_error=False)
+
+
+def check_metrics_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(metrics_bearer),
+):
+    # closed unless a token for the scraper is configured
+    token = get_config(ConfigAPI.METRICS_TOKEN, "")
+    if (
+        not token
+        or credentials is None
+        or not hmac.compare_digest(credentials.credentials, token)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@app.get(
+    "/metrics", include_in_schema=False, dependencies=[Depends(check_metrics_token)]
+)
+def get_metrics():
+    return Response(metrics.latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.get("/users/me", response_model=schemas.Me)
 async def read_users_me(
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
-    db: Session = Depends(get_session),
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_session),
 ):
-    return get_me(db, current_user)
+    return await get_me_async(db, current_user)
 
 
 @app.get("/register")
@@ -203,57 +291,44 @@ def login(
 
 
 @app.get("/summary/")
-def get_summary(
+async def get_summary(
     aquarium: str,
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
-    db: Session = Depends(get_session),
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_session),
     type: str | None = None,
 ):
     if type is not None:
-        return {type: summary.get_by_type(db, current_user.id, aquarium, type)}
-    return summary.get_for_all(db, current_user.id, aquarium)
+        return ORJSONResponse(
+            {type: await summary.get_by_type_async(db, current_user.id, aquarium, type)}
+        )
+    return ORJSONResponse(
+        await summary.get_for_all_async(db, current_user.id, aquarium)
+    )
+
+
+# reference data only changes with a deploy, clients revalidate with the ETag
+CATALOG_CACHE_CONTROL = "public, max-age=3600"
 
 
 @app.get("/testkits/")
 def get_test_kits(
+    request: Request,
     type: str | None = None,
     name: str | None = None,
-    db: Session = Depends(get_session),
 ):
     if type is not None and name is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Use either 'type' or 'name'",
         )
+    current = catalog.get_catalog()
+    headers = {"ETag": f'"{current.version}"', "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    content = None
     if type is not None:
-        return testkits.get_all_by_type(db, type)
+        content = current.get_test_kits_by_type(type)
     elif name is not None:
-        return testkits.get_by_name(db, name)
-
-
-@app.post("/events/waterchange", response_model=schemas.EventWaterChange)
-def create_water_change(
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
-    data: schemas.WaterChangeCreate,
-    db: Session = Depends(get_session),
-):
-    event_db = events.create_water_change(
-        db,
-        current_user.id,
-        data.aquarium,
-        data.unit_name,
-        data.quantity,
-        data.description,
-        data.timestamp,
-    )
-    return schemas.EventWaterChange.convert(event_db)
-
-
-@app.get("/events/waterchange/")
-def get_water_changes(
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
-    db: Session = Depends(get_session),
-    days: int | None = None,
-):
-    water_changes_db = events.get_water_changes(db, current_user.id, days=days)
-    return list(map(lambda x: schemas.EventWaterChange.convert(x), water_changes_db))
+        content = current.test_kits.get(name)
+    return ORJSONResponse(content, headers=headers)
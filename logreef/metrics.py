@@ -0,0 +1,183 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import Engine
+
+from logreef.cache import TTLCache
+from logreef.persistence.pool import get_pool_stats
+
+registry = CollectorRegistry()
+
+REQUEST_DURATION = Histogram(
+    "logreef_request_duration_seconds",
+    "Time to handle a request, by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=registry,
+)
+RESPONSES = Counter(
+    "logreef_responses",
+    "Responses sent, by route template and status code",
+    ["method", "route", "status"],
+    registry=registry,
+)
+PASSWORD_DURATION = Histogram(
+    "logreef_password_duration_seconds",
+    "Time to hash or verify a password, waiting for the password pool included",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=registry,
+)
+TOKEN_DECODE_DURATION = Histogram(
+    "logreef_token_decode_duration_seconds",
+    "Time to verify and decode a JWT, 'cached' when served from the token cache",
+    ["cached"],
+    buckets=(0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+    registry=registry,
+)
+
+# label for requests that didn't match any route, e.g. 404s on random paths
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@contextmanager
+def time_password(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PASSWORD_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+
+class PoolCollector:
+    """Pool gauges read from the engines when scraped, nothing is recorded per checkout"""
+
+    def __init__(self, engines: dict[str, Engine]):
+        self.engines = engines
+
+    def collect(self):
+        gauges = {
+            name: GaugeMetricFamily(
+                f"logreef_db_pool_{name}", description, labels=["engine"]
+            )
+            for name, description in [
+                ("size", "Connections kept open by the pool"),
+                ("checked_out", "Connections currently in use"),
+                ("overflow", "Connections opened above the pool size"),
+                ("max_overflow", "Connections allowed above the pool size"),
+            ]
+        }
+        checkouts = CounterMetricFamily(
+            "logreef_db_pool_checkouts", "Connection checkouts", labels=["engine"]
+        )
+        timeouts = CounterMetricFamily(
+            "logreef_db_pool_timeouts", "Checkouts that timed out", labels=["engine"]
+        )
+        wait = CounterMetricFamily(
+            "logreef_db_pool_wait_seconds",
+            "Time spent waiting for a connection",
+            labels=["engine"],
+        )
+        for engine_name, engine in self.engines.items():
+            # read at scrape time, engine.dispose() replaces the pool
+            stats = get_pool_stats(engine.pool)
+            for name, gauge in gauges.items():
+                if name in stats:
+                    gauge.add_metric([engine_name], stats[name])
+            if "checkouts" in stats:
+                checkouts.add_metric([engine_name], stats["checkouts"])
+                timeouts.add_metric([engine_name], stats["timeouts"])
+                wait.add_metric([engine_name], stats["wait_total_ms"] / 1000)
+        yield from gauges.values()
+        yield from [checkouts, timeouts, wait]
+
+
+class CacheCollector:
+    """Hits, misses and size of the in-memory caches, read when scraped"""
+
+    def __init__(self, caches: dict[str, TTLCache]):
+        self.caches = caches
+
+    def collect(self):
+        hits = CounterMetricFamily(
+            "logreef_cache_hits", "Cache lookups that found a value", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "logreef_cache_misses", "Cache lookups without a value", labels=["cache"]
+        )
+        size = GaugeMetricFamily(
+            "logreef_cache_size", "Entries in the cache", labels=["cache"]
+        )
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            size.add_metric([name], stats["size"])
+        yield from [hits, misses, size]
+
+
+def get_route_template(scope) -> str:
+    """Path template of the route that handled the request, e.g. /params/{param_id}"""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return UNMATCHED_ROUTE
+    # routes of included routers may only know their path after the prefix,
+    # take the prefix from the segments of the request path they didn't match
+    n_segments = path_format.count("/")
+    prefix = "/".join(scope["path"].split("/")[:-n_segments])
+    return prefix + path_format
+
+
+def register_engines(engines: dict[str, Engine]):
+    registry.register(PoolCollector(engines))
+
+
+def register_caches(caches: dict[str, TTLCache]):
+    registry.register(CacheCollector(caches))
+
+
+def latest() -> bytes:
+    return generate_latest(registry)
+
+
+class MetricsMiddleware:
+    """Records the duration and status code of each request by route template.
+
+    The route is read from the scope once the app has handled the request,
+    labels stay bounded whatever the path parameters are.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = get_route_template(scope)
+            method = scope["method"]
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            RESPONSES.labels(method, route, str(status_code)).inc()
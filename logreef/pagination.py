@@ -0,0 +1,17 @@
+import base64
+import binascii
+from datetime import datetime
+
+
+def encode_cursor(timestamp: datetime, id: int) -> str:
+    """Opaque cursor pointing right after the row ('timestamp', 'id')"""
+    raw = f"{timestamp.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        timestamp, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
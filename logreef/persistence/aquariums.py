@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
 
 from logreef.persistence import models
 from logreef.persistence.database import add_to_db
@@ -27,8 +28,7 @@ def create(
         capacity_value=capacity_value,
         capacity_units=capacity_units,
     )
-    add_to_db(db, db_aquarium)
-    return db_aquarium
+    return add_to_db(db, db_aquarium)
 
 
 def get_by_name(db: Session, user_id: int, name: str):
@@ -51,6 +51,13 @@ def get_all(db: Session, user_id: int) -> list[models.Aquarium]:
     return db.query(models.Aquarium).filter(models.Aquarium.user_id == user_id).all()
 
 
+async def get_all_async(db: AsyncSession, user_id: int) -> list[models.Aquarium]:
+    result = await db.execute(
+        select(models.Aquarium).where(models.Aquarium.user_id == user_id)
+    )
+    return list(result.scalars())
+
+
 def update_by_id(
     db: Session,
     aquarium_id: int,
@@ -69,9 +76,15 @@ def update_by_id(
         updates[models.Aquarium.capacity_value] = capacity_value
     if capacity_units is not None:
         updates[models.Aquarium.capacity_units] = capacity_units
-    db.query(models.Aquarium).filter(models.Aquarium.user_id == user_id).filter(
-        models.Aquarium.id == aquarium_id
-    ).update(updates)
+    # UPDATE ... RETURNING also refreshes an instance already in the session
+    db.scalars(
+        update(models.Aquarium)
+        .where(models.Aquarium.user_id == user_id)
+        .where(models.Aquarium.id == aquarium_id)
+        .values(updates)
+        .returning(models.Aquarium)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    ).all()
     db.commit()
     return True
 
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from logreef import schemas
+from logreef.persistence.database import Session, SessionLocal
+
+
+class Catalog:
+    """In-memory copy of param_types, test_kits, units and additives.
+
+    These tables only change through migrations so they are loaded once instead
+    of being queried, or joined, on every request.
+    """
+
+    def __init__(
+        self,
+        param_types: list[schemas.ParamType],
+        test_kits: list[schemas.TestKit],
+        units: list[schemas.Unit],
+        additives: list[schemas.Additive],
+    ):
+        self.param_types = {item.name: item for item in param_types}
+        self.test_kits = {item.name: item for item in test_kits}
+        self.units = {item.name: item for item in units}
+        self.additives = {item.name: item for item in additives}
+        self.loaded_on = datetime.now(timezone.utc)
+
+        # same content, same version on every replica: usable as an ETag
+        content = json.dumps(
+            [
+                [item.model_dump() for item in items.values()]
+                for items in [self.param_types, self.test_kits, self.units, self.additives]
+            ],
+            sort_keys=True,
+        )
+        self.version = hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    def get_test_kits_by_type(self, param_type: str) -> list[schemas.TestKit]:
+        return [
+            test_kit
+            for test_kit in self.test_kits.values()
+            if test_kit.param_type_name == param_type
+        ]
+
+    def param_type_display_name(self, name: str) -> str:
+        param_type = self.param_types.get(name)
+        return param_type.display_name or name if param_type else name
+
+    def param_type_unit(self, name: str) -> str:
+        param_type = self.param_types.get(name)
+        return param_type.unit if param_type else ""
+
+    def test_kit_display_name(self, name: str) -> str:
+        test_kit = self.test_kits.get(name)
+        return test_kit.display_name if test_kit else name
+
+
+_catalog: Catalog | None = None
+_lock = threading.Lock()
+
+
+def load(db: Session) -> Catalog:
+    """(Re)load the catalog from the db, replacing the current one"""
+    global _catalog
+
+    def select(sql: str) -> list[dict[str, any]]:
+        return [row._asdict() for row in db.execute(text(sql))]
+
+    catalog = Catalog(
+        param_types=[
+            schemas.ParamType(**row)
+            for row in select(
+                "SELECT name, unit, display_name FROM param_types ORDER BY name"
+            )
+        ],
+        test_kits=[
+            schemas.TestKit(**row)
+            for row in select(
+                """
+                SELECT name, param_type_name, display_name, display_unit, description, is_default
+                FROM test_kits ORDER BY name
+                """
+            )
+        ],
+        units=[
+            schemas.Unit(**row)
+            for row in select("SELECT name, display_name FROM units ORDER BY name")
+        ],
+        additives=[
+            schemas.Additive(**row)
+            for row in select("SELECT name, display_name FROM additives ORDER BY name")
+        ],
+    )
+    _catalog = catalog
+    return catalog
+
+
+def get_catalog() -> Catalog:
+    """Current catalog, loaded on first use"""
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                db = SessionLocal()
+                try:
+                    load(db)
+                finally:
+                    db.close()
+    return _catalog
@@ -1,12 +1,80 @@
-from sqlalchemy import create_engine
+import queue
+import threading
+from typing import Iterator
+
+from sqlalchemy import create_engine, make_url, insert, inspect
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.pool import NullPool
+
+from logreef.config import get_config, get_config_flag, ConfigAPI
+from logreef.instrumentation import instrument
+from logreef.persistence.pool import TimedQueuePool, TimedAsyncQueuePool
+
+
+def get_async_url(url: str) -> str:
+    """Same database as 'url' but through the asyncpg driver"""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in url.query:
+        # asyncpg names the libpq 'sslmode' option 'ssl'
+        url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(
+            ["sslmode"]
+        )
+    return url.render_as_string(hide_password=False)
+
+
+def get_engine_options(is_async: bool = False) -> dict[str, any]:
+    """Pool and connection settings of the sync (psycopg2) or async (asyncpg) engine"""
+    options = {"pool_pre_ping": get_config_flag(ConfigAPI.DB_POOL_PRE_PING)}
+    connect_args = {}
 
-from logreef.config import get_config, ConfigAPI
+    if get_config_flag(ConfigAPI.DB_PGBOUNCER):
+        # PgBouncer does the pooling: don't keep connections on our side and,
+        # in transaction mode, a server connection may change between statements
+        # so asyncpg prepared statements can't be reused. Startup parameters are
+        # rejected by PgBouncer, set statement_timeout on the database role instead
+        options["poolclass"] = NullPool
+        if is_async:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    else:
+        options.update(
+            {
+                "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+                "pool_size": int(get_config(ConfigAPI.DB_POOL_SIZE, 5)),
+                "max_overflow": int(get_config(ConfigAPI.DB_MAX_OVERFLOW, 10)),
+                "pool_timeout": float(get_config(ConfigAPI.DB_POOL_TIMEOUT, 30)),
+                "pool_recycle": int(get_config(ConfigAPI.DB_POOL_RECYCLE, -1)),
+            }
+        )
+        statement_timeout = int(get_config(ConfigAPI.DB_STATEMENT_TIMEOUT_MS, 0))
+        if statement_timeout > 0:
+            if is_async:
+                connect_args["server_settings"] = {
+                    "statement_timeout": str(statement_timeout)
+                }
+            else:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout}"
 
-engine = create_engine(get_config(ConfigAPI.DB_URL))
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+engine = create_engine(get_config(ConfigAPI.DB_URL), **get_engine_options())
+# instances returned by INSERT/UPDATE ... RETURNING stay loaded after commit,
+# expiring them would cost a SELECT on the next attribute access
 SessionLocal = scoped_session(
-    sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+)
+async_engine = create_async_engine(
+    get_async_url(get_config(ConfigAPI.DB_URL)), **get_engine_options(is_async=True)
+)
+instrument(engine)
+instrument(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
 )
 Base = declarative_base()
 
@@ -22,13 +90,103 @@ def get_session():
         db.close()
 
 
+async def get_async_session():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+
 def add_to_db(db: Session, model):
-    db.add(model)
+    """Insert the column values set on 'model' with INSERT ... RETURNING and commit.
+
+    Returns the persisted instance, loaded from the returned row: db defaults,
+    ids and normalized values without a refresh SELECT.
+    """
+    mapper = inspect(model).mapper
+    values = {
+        attr.key: getattr(model, attr.key)
+        for attr in mapper.column_attrs
+        if attr.key in model.__dict__
+    }
+    db_model = db.scalar(insert(mapper.class_).values(**values).returning(mapper.class_))
     db.commit()
-    db.refresh(model)
-    return model
+    return db_model
 
 
 def delete_from_db(db: Session, model):
     db.delete(model)
     db.commit()
+
+
+def stream_copy_to(
+    sql: str,
+    params: dict | None = None,
+    chunk_size: int = 64 * 1024,
+    max_pending_chunks: int = 8,
+) -> Iterator[bytes]:
+    """Stream the output of a 'COPY ... TO STDOUT' statement in chunks.
+
+    The COPY runs on its own connection in a background thread and at most
+    'max_pending_chunks' are buffered, so memory stays constant whatever the
+    size of the result. 'sql' uses DBAPI placeholders, e.g. %(user_id)s
+    """
+    chunks = queue.Queue(maxsize=max_pending_chunks)
+    cancelled = threading.Event()
+    done = object()
+
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    class ChunkWriter:
+        def __init__(self):
+            self.buffer = bytearray()
+
+        def write(self, data: bytes):
+            if cancelled.is_set():
+                raise Exception("COPY cancelled")
+            self.buffer += data
+            if len(self.buffer) >= chunk_size:
+                self.flush()
+
+        def flush(self):
+            if self.buffer:
+                put(bytes(self.buffer))
+                self.buffer = bytearray()
+
+    def copy():
+        conn = engine.raw_connection()
+        try:
+            writer = ChunkWriter()
+            with conn.cursor() as cur:
+                cur.copy_expert(cur.mogrify(sql, params).decode(), writer)
+            conn.commit()
+            writer.flush()
+        except Exception as ex:
+            if cancelled.is_set():
+                # connection may still be in COPY state, don't return it to the pool
+                conn.invalidate()
+            put(ex)
+        finally:
+            conn.close()
+            put(done)
+
+    thread = threading.Thread(target=copy, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
@@ -1,27 +1,64 @@
 from datetime import datetime, timezone, timedelta
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, text, tuple_, TextClause, Result
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from logreef import schemas
 from logreef.persistence import models
 from logreef.persistence import aquariums
+from logreef.persistence.catalog import Catalog, get_catalog
 
 
 def get_water_changes(
-    db: Session, user_id: int, aquarium_id: int | None = None, days: int | None = None
+    db: Session,
+    user_id: int,
+    aquarium: int | str | None = None,
+    days: int | None = None,
+    limit: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
 ) -> list[models.Events]:
-    raw_query = (
-        db.query(models.Events)
+    """Water change events, most recent first, with their water change and unit
+    loaded by the same query. 'cursor' is the (timestamp, id) of the last event
+    of the previous page."""
+    query = (
+        select(models.Events)
+        .options(
+            joinedload(models.Events.water_change).joinedload(
+                models.EventWaterChanges.unit
+            )
+        )
         .where(models.Events.user_id == user_id)
-        .where(models.Events.water_change_id is not None)
+        .where(models.Events.water_change_id.isnot(None))
     )
 
+    if type(aquarium) is int:
+        query = query.where(models.Events.aquarium_id == aquarium)
+    elif type(aquarium) is str:
+        query = query.where(
+            models.Events.aquarium_id
+            == select(models.Aquarium.id)
+            .where(models.Aquarium.user_id == user_id)
+            .where(models.Aquarium.name == aquarium)
+            .scalar_subquery()
+        )
+
     if days is not None and days > 0:
         ts = datetime.now(timezone.utc) - timedelta(days=days)
-        raw_query = raw_query.where(models.Events.timestamp > ts)
+        query = query.where(models.Events.timestamp > ts)
+
+    if cursor is not None:
+        query = query.where(
+            tuple_(models.Events.timestamp, models.Events.id) < tuple_(*cursor)
+        )
+
+    query = query.order_by(models.Events.timestamp.desc(), models.Events.id.desc())
 
-    raw_query = raw_query.order_by(models.Events.timestamp.desc())
+    if limit is not None:
+        query = query.limit(limit)
 
-    return raw_query.all()
+    return list(db.scalars(query))
 
 
 def create_water_change(
@@ -42,19 +79,230 @@ def create_water_change(
     if not timestamp:
         timestamp = datetime.now(timezone.utc)
 
-    db_water_change = models.EventWaterChanges(
-        quantity=quantity, description=description, unit_name=unit_name
+    # INSERT ... RETURNING both rows, no refresh SELECT after commit
+    db_water_change = db.scalar(
+        insert(models.EventWaterChanges)
+        .values(quantity=quantity, description=description, unit_name=unit_name)
+        .returning(models.EventWaterChanges)
+    )
+    db_event = db.scalar(
+        insert(models.Events)
+        .values(
+            user_id=user_id,
+            aquarium_id=aquarium_id,
+            water_change_id=db_water_change.id,
+            timestamp=timestamp,
+        )
+        .returning(models.Events)
+    )
+    # attach the water change as loaded, accessing it won't lazy load
+    set_committed_value(db_event, "water_change", db_water_change)
+    db.commit()
+
+    return db_event
+
+
+def get_timeline(
+    db: Session,
+    user_id: int,
+    aquarium: str,
+    days: int | None = None,
+    limit: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
+) -> list[schemas.Event]:
+    sql, data = _get_timeline_query(user_id, aquarium, days, limit, cursor)
+    return _to_events(db.execute(sql, data))
+
+
+async def get_timeline_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium: str,
+    days: int | None = None,
+    limit: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
+) -> list[schemas.Event]:
+    sql, data = _get_timeline_query(user_id, aquarium, days, limit, cursor)
+    return _to_events(await db.execute(sql, data))
+
+
+def _get_timeline_query(
+    user_id: int,
+    aquarium: str,
+    days: int | None,
+    limit: int | None,
+    cursor: tuple[datetime, int] | None,
+) -> tuple[TextClause, dict[str, any]]:
+    # every event type in one pass, units and additives come from the catalog
+    query = """
+    SELECT
+        e.id,
+        e.aquarium_id,
+        e.timestamp,
+        e.water_change_id,
+        e.dosing_id,
+        e.misc_id,
+        w.quantity AS water_change_quantity,
+        w.description AS water_change_description,
+        w.unit_name AS water_change_unit_name,
+        d.additive_name AS dosing_additive_name,
+        d.quantity AS dosing_quantity,
+        d.description AS dosing_description,
+        d.unit_name AS dosing_unit_name,
+        m.description AS misc_description
+    FROM events AS e
+    JOIN aquariums ON e.aquarium_id = aquariums.id
+    LEFT JOIN event_water_changes AS w ON e.water_change_id = w.id
+    LEFT JOIN event_dosings AS d ON e.dosing_id = d.id
+    LEFT JOIN event_miscs AS m ON e.misc_id = m.id
+    WHERE e.user_id = :user_id
+        AND aquariums.name = :aquarium_name
+        AND (
+            e.water_change_id IS NOT NULL
+            OR e.dosing_id IS NOT NULL
+            OR e.misc_id IS NOT NULL
+        )
+    """
+    data = {"user_id": user_id, "aquarium_name": aquarium}
+    if days is not None:
+        query += " AND e.timestamp > current_date - make_interval(days => :days)"
+        data["days"] = days
+    if cursor is not None:
+        query += " AND (e.timestamp, e.id) < (:cursor_timestamp, :cursor_id)"
+        data["cursor_timestamp"], data["cursor_id"] = cursor
+
+    query += " ORDER BY e.timestamp DESC, e.id DESC"
+
+    if limit is not None:
+        query += " LIMIT :limit"
+        data["limit"] = limit
+
+    return text(query), data
+
+
+def _to_events(result: Result) -> list[schemas.Event]:
+    catalog = get_catalog()
+    return [_to_event(catalog, row) for row in result]
+
+
+def _get_unit(catalog: Catalog, name: str | None) -> schemas.Unit | None:
+    if name is None:
+        return None
+    return catalog.units.get(name) or schemas.Unit(name=name, display_name=name)
+
+
+def _to_dosing(catalog: Catalog, additive_name, quantity, description, unit_name):
+    return schemas.Dosing(
+        additive=catalog.additives.get(additive_name)
+        or schemas.Additive(name=additive_name, display_name=additive_name),
+        quantity=quantity,
+        description=description,
+        unit=_get_unit(catalog, unit_name),
     )
 
-    db_event = models.Events(
-        user_id=user_id,
-        aquarium_id=aquarium_id,
-        water_change=db_water_change,
-        timestamp=timestamp,
+
+def _to_event(catalog: Catalog, row) -> schemas.Event:
+    if row.water_change_id is not None:
+        type = "water_change"
+        detail = schemas.WaterChange(
+            quantity=row.water_change_quantity,
+            description=row.water_change_description,
+            unit=_get_unit(catalog, row.water_change_unit_name),
+        )
+    elif row.dosing_id is not None:
+        type = "dosing"
+        detail = _to_dosing(
+            catalog,
+            row.dosing_additive_name,
+            row.dosing_quantity,
+            row.dosing_description,
+            row.dosing_unit_name,
+        )
+    else:
+        type = "misc"
+        detail = schemas.Misc(description=row.misc_description)
+    return schemas.Event(
+        id=row.id,
+        type=type,
+        aquarium_id=row.aquarium_id,
+        timestamp=row.timestamp,
+        detail=detail,
     )
 
-    db.add(db_event)
+
+def create_dosings(
+    db: Session,
+    user_id: int,
+    aquarium: int | str,
+    dosings: list[schemas.DosingCreate],
+) -> list[schemas.Event]:
+    """Log a dosing run: one event per dosing, two INSERT statements in all"""
+    if type(aquarium) is str:
+        aquarium_db = aquariums.get_by_name(db, user_id, aquarium)
+        aquarium_id = aquarium_db.id if aquarium_db is not None else None
+    else:
+        aquarium_id = db.scalar(
+            select(models.Aquarium.id)
+            .where(models.Aquarium.user_id == user_id)
+            .where(models.Aquarium.id == aquarium)
+        )
+    if aquarium_id is None:
+        raise ValueError(f"Aquarium '{aquarium}' not found")
+
+    catalog = get_catalog()
+    for dosing in dosings:
+        if dosing.additive_name not in catalog.additives:
+            raise ValueError(f"Additive '{dosing.additive_name}' not supported")
+        if dosing.unit_name is not None and dosing.unit_name not in catalog.units:
+            raise ValueError(f"Unit '{dosing.unit_name}' not supported")
+    if not dosings:
+        return []
+
+    now = datetime.now(timezone.utc)
+    # RETURNING rows in the same order as the parameters, to pair them up
+    dosing_ids = db.scalars(
+        insert(models.EventDosings).returning(
+            models.EventDosings.id, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "additive_name": dosing.additive_name,
+                "quantity": dosing.quantity,
+                "description": dosing.description,
+                "unit_name": dosing.unit_name,
+            }
+            for dosing in dosings
+        ],
+    ).all()
+    event_rows = db.execute(
+        insert(models.Events).returning(
+            models.Events.id, models.Events.timestamp, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "user_id": user_id,
+                "aquarium_id": aquarium_id,
+                "dosing_id": dosing_id,
+                "timestamp": dosing.timestamp or now,
+            }
+            for dosing_id, dosing in zip(dosing_ids, dosings)
+        ],
+    ).all()
     db.commit()
-    db.refresh(db_event)
 
-    return db_event
+    return [
+        schemas.Event(
+            id=row.id,
+            type="dosing",
+            aquarium_id=aquarium_id,
+            timestamp=row.timestamp,
+            detail=_to_dosing(
+                catalog,
+                dosing.additive_name,
+                dosing.quantity,
+                dosing.description,
+                dosing.unit_name,
+            ),
+        )
+        for row, dosing in zip(event_rows, dosings)
+    ]
@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
 from logreef.persistence import models
+from logreef.persistence.database import add_to_db
 
 
 def create(
@@ -26,8 +27,4 @@ def create(
         sent_on=now,
     )
 
-    db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
-
-    return db_message
+    return add_to_db(db, db_message)
@@ -0,0 +1,11 @@
+-- param_values hot queries filter on user, aquarium and type and order by timestamp
+CREATE INDEX IF NOT EXISTS param_values_user_aquarium_type_timestamp_idx
+    ON param_values (user_id, aquarium_id, param_type_name, timestamp DESC)
+    INCLUDE (id, value);
+
+-- aquariums are resolved by (user_id, name) on almost every request
+CREATE INDEX IF NOT EXISTS aquariums_user_id_name_idx
+    ON aquariums (user_id, name);
+
+CREATE INDEX IF NOT EXISTS events_user_aquarium_timestamp_idx
+    ON events (user_id, aquarium_id, timestamp DESC);
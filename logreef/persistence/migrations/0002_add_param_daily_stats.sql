@@ -0,0 +1,219 @@
+-- daily rollup of param_values, window stats read O(days) rows instead of every
+-- reading. Maintained by the statement triggers below, rows of a day with no
+-- readings left are removed so no foreign keys are needed.
+CREATE TABLE IF NOT EXISTS param_daily_stats (
+    user_id INTEGER NOT NULL,
+    aquarium_id INTEGER NOT NULL,
+    param_type_name VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    count INTEGER NOT NULL,
+    sum NUMERIC NOT NULL,
+    sum_squares NUMERIC NOT NULL,
+    min NUMERIC,
+    max NUMERIC,
+    last_value NUMERIC,
+    last_timestamp TIMESTAMP,
+    PRIMARY KEY (user_id, aquarium_id, param_type_name, day)
+);
+
+-- recompute the given (user, aquarium, param type, day) rows from param_values
+CREATE OR REPLACE FUNCTION param_daily_stats_refresh(
+    user_ids INTEGER[],
+    aquarium_ids INTEGER[],
+    param_type_names VARCHAR[],
+    days DATE[]
+) RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    -- create missing rows and lock all of them: concurrent writers to the same
+    -- day wait here, the statements below then see their committed readings
+    INSERT INTO param_daily_stats
+        (user_id, aquarium_id, param_type_name, day, count, sum, sum_squares)
+    SELECT k.user_id, k.aquarium_id, k.param_type_name, k.day, 0, 0, 0
+    FROM unnest(user_ids, aquarium_ids, param_type_names, days)
+        AS k(user_id, aquarium_id, param_type_name, day)
+    ON CONFLICT DO NOTHING;
+
+    PERFORM 1
+    FROM param_daily_stats AS s
+    JOIN unnest(user_ids, aquarium_ids, param_type_names, days)
+        AS k(user_id, aquarium_id, param_type_name, day)
+        ON s.user_id = k.user_id
+        AND s.aquarium_id = k.aquarium_id
+        AND s.param_type_name = k.param_type_name
+        AND s.day = k.day
+    FOR UPDATE OF s;
+
+    UPDATE param_daily_stats AS s
+    SET
+        count = agg.count,
+        sum = agg.sum,
+        sum_squares = agg.sum_squares,
+        min = agg.min,
+        max = agg.max,
+        last_value = agg.last_value,
+        last_timestamp = agg.last_timestamp
+    FROM (
+        SELECT
+            k.user_id,
+            k.aquarium_id,
+            k.param_type_name,
+            k.day,
+            COUNT(p.id) AS count,
+            COALESCE(SUM(p.value), 0) AS sum,
+            COALESCE(SUM(p.value * p.value), 0) AS sum_squares,
+            MIN(p.value) AS min,
+            MAX(p.value) AS max,
+            (ARRAY_AGG(p.value ORDER BY p.timestamp DESC, p.id DESC))[1] AS last_value,
+            MAX(p.timestamp) AS last_timestamp
+        FROM unnest(user_ids, aquarium_ids, param_type_names, days)
+            AS k(user_id, aquarium_id, param_type_name, day)
+        LEFT JOIN param_values AS p
+            ON p.user_id = k.user_id
+            AND p.aquarium_id = k.aquarium_id
+            AND p.param_type_name = k.param_type_name
+            AND p.timestamp >= k.day
+            AND p.timestamp < k.day + 1
+        GROUP BY k.user_id, k.aquarium_id, k.param_type_name, k.day
+    ) AS agg
+    WHERE s.user_id = agg.user_id
+        AND s.aquarium_id = agg.aquarium_id
+        AND s.param_type_name = agg.param_type_name
+        AND s.day = agg.day;
+
+    DELETE FROM param_daily_stats AS s
+    USING unnest(user_ids, aquarium_ids, param_type_names, days)
+        AS k(user_id, aquarium_id, param_type_name, day)
+    WHERE s.user_id = k.user_id
+        AND s.aquarium_id = k.aquarium_id
+        AND s.param_type_name = k.param_type_name
+        AND s.day = k.day
+        AND s.count = 0;
+END;
+$$;
+
+-- statement trigger: the days touched by the whole statement are refreshed once
+CREATE OR REPLACE FUNCTION param_daily_stats_on_change() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    user_ids INTEGER[];
+    aquarium_ids INTEGER[];
+    param_type_names VARCHAR[];
+    days DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT
+            ARRAY_AGG(k.user_id),
+            ARRAY_AGG(k.aquarium_id),
+            ARRAY_AGG(k.param_type_name),
+            ARRAY_AGG(k.day)
+        INTO user_ids, aquarium_ids, param_type_names, days
+        FROM (
+            SELECT DISTINCT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM new_rows
+            WHERE param_type_name IS NOT NULL
+        ) AS k;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT
+            ARRAY_AGG(k.user_id),
+            ARRAY_AGG(k.aquarium_id),
+            ARRAY_AGG(k.param_type_name),
+            ARRAY_AGG(k.day)
+        INTO user_ids, aquarium_ids, param_type_names, days
+        FROM (
+            SELECT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM old_rows
+            WHERE param_type_name IS NOT NULL
+            UNION
+            SELECT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM new_rows
+            WHERE param_type_name IS NOT NULL
+        ) AS k;
+    ELSE
+        SELECT
+            ARRAY_AGG(k.user_id),
+            ARRAY_AGG(k.aquarium_id),
+            ARRAY_AGG(k.param_type_name),
+            ARRAY_AGG(k.day)
+        INTO user_ids, aquarium_ids, param_type_names, days
+        FROM (
+            SELECT DISTINCT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM old_rows
+            WHERE param_type_name IS NOT NULL
+        ) AS k;
+    END IF;
+
+    IF user_ids IS NOT NULL THEN
+        PERFORM param_daily_stats_refresh(user_ids, aquarium_ids, param_type_names, days);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS param_values_daily_stats_insert ON param_values;
+CREATE TRIGGER param_values_daily_stats_insert
+    AFTER INSERT ON param_values
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION param_daily_stats_on_change();
+
+DROP TRIGGER IF EXISTS param_values_daily_stats_update ON param_values;
+CREATE TRIGGER param_values_daily_stats_update
+    AFTER UPDATE ON param_values
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION param_daily_stats_on_change();
+
+DROP TRIGGER IF EXISTS param_values_daily_stats_delete ON param_values;
+CREATE TRIGGER param_values_daily_stats_delete
+    AFTER DELETE ON param_values
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION param_daily_stats_on_change();
+
+-- rebuild the rollup from param_values, for one user or everyone. Returns the
+-- number of rows written.
+CREATE OR REPLACE FUNCTION param_daily_stats_backfill(
+    for_user_id INTEGER DEFAULT NULL
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    n_rows INTEGER;
+BEGIN
+    -- no writes to param_values until the rebuild commits
+    LOCK TABLE param_values IN SHARE MODE;
+
+    DELETE FROM param_daily_stats
+    WHERE for_user_id IS NULL OR user_id = for_user_id;
+
+    INSERT INTO param_daily_stats (
+        user_id,
+        aquarium_id,
+        param_type_name,
+        day,
+        count,
+        sum,
+        sum_squares,
+        min,
+        max,
+        last_value,
+        last_timestamp
+    )
+    SELECT
+        user_id,
+        aquarium_id,
+        param_type_name,
+        timestamp::DATE,
+        COUNT(1),
+        SUM(value),
+        SUM(value * value),
+        MIN(value),
+        MAX(value),
+        (ARRAY_AGG(value ORDER BY timestamp DESC, id DESC))[1],
+        MAX(timestamp)
+    FROM param_values
+    WHERE param_type_name IS NOT NULL
+        AND (for_user_id IS NULL OR user_id = for_user_id)
+    GROUP BY user_id, aquarium_id, param_type_name, timestamp::DATE;
+
+    GET DIAGNOSTICS n_rows = ROW_COUNT;
+    RETURN n_rows;
+END;
+$$;
+
+SELECT param_daily_stats_backfill();
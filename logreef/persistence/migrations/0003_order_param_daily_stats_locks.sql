@@ -0,0 +1,150 @@
+-- two transactions refreshing the same days in different orders deadlocked,
+-- e.g. concurrent imports whose COPY chunks cover overlapping days. Row locks
+-- are now taken in key order, and a transaction first takes an advisory lock
+-- per user so that its later statements can't cross another one of the same
+-- user (ordering within one statement isn't enough for those).
+
+-- recompute the given (user, aquarium, param type, day) rows from param_values
+CREATE OR REPLACE FUNCTION param_daily_stats_refresh(
+    user_ids INTEGER[],
+    aquarium_ids INTEGER[],
+    param_type_names VARCHAR[],
+    days DATE[]
+) RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    -- held until commit, writers of the same user refresh one at a time.
+    -- 7310002: arbitrary class id, the (int, int) key space is separate from
+    -- the migrations lock
+    PERFORM pg_advisory_xact_lock(7310002, u.user_id)
+    FROM (SELECT DISTINCT unnest(user_ids) AS user_id ORDER BY 1) AS u;
+
+    -- create missing rows and lock all of them: concurrent writers to the same
+    -- day wait here, the statements below then see their committed readings
+    INSERT INTO param_daily_stats
+        (user_id, aquarium_id, param_type_name, day, count, sum, sum_squares)
+    SELECT k.user_id, k.aquarium_id, k.param_type_name, k.day, 0, 0, 0
+    FROM unnest(user_ids, aquarium_ids, param_type_names, days)
+        AS k(user_id, aquarium_id, param_type_name, day)
+    ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day
+    ON CONFLICT DO NOTHING;
+
+    PERFORM 1
+    FROM (
+        SELECT 1
+        FROM param_daily_stats AS s
+        JOIN unnest(user_ids, aquarium_ids, param_type_names, days)
+            AS k(user_id, aquarium_id, param_type_name, day)
+            ON s.user_id = k.user_id
+            AND s.aquarium_id = k.aquarium_id
+            AND s.param_type_name = k.param_type_name
+            AND s.day = k.day
+        ORDER BY s.user_id, s.aquarium_id, s.param_type_name, s.day
+        FOR UPDATE OF s
+    ) AS locked;
+
+    UPDATE param_daily_stats AS s
+    SET
+        count = agg.count,
+        sum = agg.sum,
+        sum_squares = agg.sum_squares,
+        min = agg.min,
+        max = agg.max,
+        last_value = agg.last_value,
+        last_timestamp = agg.last_timestamp
+    FROM (
+        SELECT
+            k.user_id,
+            k.aquarium_id,
+            k.param_type_name,
+            k.day,
+            COUNT(p.id) AS count,
+            COALESCE(SUM(p.value), 0) AS sum,
+            COALESCE(SUM(p.value * p.value), 0) AS sum_squares,
+            MIN(p.value) AS min,
+            MAX(p.value) AS max,
+            (ARRAY_AGG(p.value ORDER BY p.timestamp DESC, p.id DESC))[1] AS last_value,
+            MAX(p.timestamp) AS last_timestamp
+        FROM unnest(user_ids, aquarium_ids, param_type_names, days)
+            AS k(user_id, aquarium_id, param_type_name, day)
+        LEFT JOIN param_values AS p
+            ON p.user_id = k.user_id
+            AND p.aquarium_id = k.aquarium_id
+            AND p.param_type_name = k.param_type_name
+            AND p.timestamp >= k.day
+            AND p.timestamp < k.day + 1
+        GROUP BY k.user_id, k.aquarium_id, k.param_type_name, k.day
+    ) AS agg
+    WHERE s.user_id = agg.user_id
+        AND s.aquarium_id = agg.aquarium_id
+        AND s.param_type_name = agg.param_type_name
+        AND s.day = agg.day;
+
+    DELETE FROM param_daily_stats AS s
+    USING unnest(user_ids, aquarium_ids, param_type_names, days)
+        AS k(user_id, aquarium_id, param_type_name, day)
+    WHERE s.user_id = k.user_id
+        AND s.aquarium_id = k.aquarium_id
+        AND s.param_type_name = k.param_type_name
+        AND s.day = k.day
+        AND s.count = 0;
+END;
+$$;
+
+-- statement trigger: the days touched by the whole statement are refreshed once
+CREATE OR REPLACE FUNCTION param_daily_stats_on_change() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    user_ids INTEGER[];
+    aquarium_ids INTEGER[];
+    param_type_names VARCHAR[];
+    days DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT
+            ARRAY_AGG(k.user_id ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.aquarium_id ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.param_type_name ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.day ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day)
+        INTO user_ids, aquarium_ids, param_type_names, days
+        FROM (
+            SELECT DISTINCT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM new_rows
+            WHERE param_type_name IS NOT NULL
+        ) AS k;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT
+            ARRAY_AGG(k.user_id ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.aquarium_id ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.param_type_name ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.day ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day)
+        INTO user_ids, aquarium_ids, param_type_names, days
+        FROM (
+            SELECT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM old_rows
+            WHERE param_type_name IS NOT NULL
+            UNION
+            SELECT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM new_rows
+            WHERE param_type_name IS NOT NULL
+        ) AS k;
+    ELSE
+        SELECT
+            ARRAY_AGG(k.user_id ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.aquarium_id ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.param_type_name ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day),
+            ARRAY_AGG(k.day ORDER BY k.user_id, k.aquarium_id, k.param_type_name, k.day)
+        INTO user_ids, aquarium_ids, param_type_names, days
+        FROM (
+            SELECT DISTINCT user_id, aquarium_id, param_type_name, timestamp::DATE AS day
+            FROM old_rows
+            WHERE param_type_name IS NOT NULL
+        ) AS k;
+    END IF;
+
+    IF user_ids IS NOT NULL THEN
+        PERFORM param_daily_stats_refresh(user_ids, aquarium_ids, param_type_names, days);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
@@ -0,0 +1,4 @@
+-- cursor pages over all param types order and filter on (timestamp, id), the
+-- 0001 index has param_type_name in between and can't serve them
+CREATE INDEX IF NOT EXISTS param_values_user_aquarium_timestamp_id_idx
+    ON param_values (user_id, aquarium_id, timestamp DESC, id DESC);
@@ -0,0 +1,68 @@
+import logging
+import re
+from pathlib import Path
+
+from sqlalchemy import Engine, text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent
+MIGRATION_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# arbitrary key so that concurrent replicas don't apply migrations twice
+ADVISORY_LOCK_ID = 7310001
+
+
+def get_migrations() -> list[tuple[int, str, Path]]:
+    migrations = []
+    for path in MIGRATIONS_DIR.iterdir():
+        match = MIGRATION_FILENAME.match(path.name)
+        if match is None:
+            continue
+        migrations.append((int(match.group(1)), match.group(2), path))
+    return sorted(migrations)
+
+
+def get_applied(engine: Engine) -> dict[int, str]:
+    with engine.begin() as conn:
+        _create_migrations_table(conn)
+        result = conn.execute(text("SELECT version, name FROM schema_migrations"))
+        return {row.version: row.name for row in result}
+
+
+def apply(engine: Engine) -> list[str]:
+    """Apply all pending migrations in order, returns names of applied ones"""
+    applied = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        _create_migrations_table(conn)
+        versions = {
+            row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))
+        }
+        for version, name, path in get_migrations():
+            if version in versions:
+                continue
+            logger.info(f"applying migration {version:04d}_{name}")
+            conn.exec_driver_sql(path.read_text())
+            conn.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"
+                ),
+                {"version": version, "name": name},
+            )
+            applied.append(name)
+    return applied
+
+
+def _create_migrations_table(conn):
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_on TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    )
@@ -1,11 +1,22 @@
 from datetime import datetime, timezone, timedelta
+from typing import Iterator, BinaryIO
+import csv
+import io
+import math
+import threading
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, insert, select, update, TextClause, Result
 
 from logreef.persistence import models
 from logreef.persistence import aquariums
+from logreef.persistence.catalog import Catalog, get_catalog
+from logreef.persistence.database import add_to_db, stream_copy_to
+from logreef.cache import TTLCache
 from logreef.config import (
+    get_config,
+    ConfigAPI,
     TestKits,
     ParamTypes,
     default_test_kits,
@@ -15,14 +26,53 @@ from logreef.config import (
 from logreef.units.converter import convert_unit_for
 from logreef import schemas
 
+# raw summaries by (user id, aquarium name, day), see logreef/summary.py. Every
+# write to param_values drops the entries of its user, in this process only:
+# other workers and replicas keep theirs until they expire, hence the short ttl.
+summary_cache = TTLCache(
+    max_size=int(get_config(ConfigAPI.SUMMARY_CACHE_MAX_SIZE, 10000)),
+    ttl=float(get_config(ConfigAPI.SUMMARY_CACHE_TTL_SECONDS, 5)),
+)
+# invalidations per user id, a summary queried before one isn't cached after it
+_summary_generations: dict[int, int] = {}
+_summary_lock = threading.Lock()
+
+
+def invalidate_summaries(user_id: int):
+    with _summary_lock:
+        _summary_generations[user_id] = _summary_generations.get(user_id, 0) + 1
+        summary_cache.pop_where(lambda key, _: key[0] == user_id)
+
+
+def get_summary_generation(user_id: int) -> int:
+    """To read before querying the summaries to cache, see 'cache_summaries'"""
+    with _summary_lock:
+        return _summary_generations.get(user_id, 0)
+
+
+def cache_summaries(key: tuple, results: dict[str, dict[str, any]], generation: int):
+    """Cache 'results' of the user key[0] unless its summaries were invalidated
+    since 'generation': the query may have missed the write that did it"""
+    with _summary_lock:
+        if _summary_generations.get(key[0], 0) == generation:
+            summary_cache.set(key, results)
+
+
+def backfill_daily_stats(db: Session, user_id: int | None = None) -> int:
+    """Rebuild the param_daily_stats rollup of a user, or of everyone, from
+    param_values. Triggers keep it up to date afterwards."""
+    n_rows = db.execute(
+        text("SELECT param_daily_stats_backfill(:user_id)"), {"user_id": user_id}
+    ).scalar()
+    db.commit()
+    return n_rows
+
 
 def get_type_by_user(db: Session, user_id: int, aquarium_name: str) -> list[str]:
     sql = text(
         """
-            SELECT DISTINCT(param_types.name)
+            SELECT DISTINCT(param_values.param_type_name)
             FROM param_values
-            JOIN users ON param_values.user_id = users.id
-            JOIN param_types ON param_values.param_type_name = param_types.name
             JOIN aquariums ON param_values.aquarium_id = aquariums.id
             WHERE param_values.user_id = :user_id
                 AND aquariums.name = :aquarium_name
@@ -32,22 +82,18 @@ def get_type_by_user(db: Session, user_id: int, aquarium_name: str) -> list[str]
     return [row[0] for row in result]
 
 
-def get_type(db: Session, name: str):
-    return (
-        db.query(models.ParamType)
-        .filter(models.ParamType.name == name.strip().lower())
-        .first()
-    )
+def get_type(db: Session, name: str) -> schemas.ParamType | None:
+    return get_catalog().param_types.get(name.strip().lower())
 
 
 def create(
     db: Session,
     user_id: int,
     aquarium: models.Aquarium | str | int,
-    param_type: models.ParamType | str | ParamTypes,
+    param_type: models.ParamType | schemas.ParamType | str | ParamTypes,
     value: float,
     timestamp: datetime | None = None,
-    test_kit: models.TestKit | str | TestKits | None = None,
+    test_kit: models.TestKit | schemas.TestKit | str | TestKits | None = None,
     note: str | None = None,
     commit: bool = True,
     convert_value: bool = True,
@@ -56,10 +102,7 @@ def create(
 
     timestamp = now if not timestamp else timestamp
 
-    if type(param_type) is models.ParamType:
-        param_type = get_param_type(param_type.name)
-    elif type(param_type) is str:
-        param_type = get_param_type(param_type)
+    param_type = _resolve_param_type(param_type)
 
     if type(aquarium) is str:
         aquarium_id = aquariums.get_by_name(db, user_id, aquarium).id
@@ -68,19 +111,12 @@ def create(
     elif type(aquarium) is models.Aquarium:
         aquarium_id = aquarium.id
 
-    if type(test_kit) is str:
-        test_kit = get_test_kit(test_kit)
-    elif type(test_kit) is models.TestKit:
-        test_kit = get_test_kit(test_kit.name)
-    elif test_kit is None:
-        test_kit = default_test_kits[param_type.value]
+    test_kit = _resolve_test_kit(param_type, test_kit)
 
     # convert value
     # TODO: Also save value not converted?
     if convert_value:
-        value_converted = convert_unit_for(param_type, test_kit, value)
-        if value_converted is None:
-            raise Exception(f"{param_type.value} and/or {test_kit.value} not supported")
+        value_converted = _convert_value(param_type, test_kit, value)
     else:
         value_converted = value
 
@@ -98,25 +134,142 @@ def create(
     )
 
     if commit:
-        db.add(db_value)
-        db.commit()
-        db.refresh(db_value)
+        db_value = add_to_db(db, db_value)
+        # without commit, the caller invalidates once it adds and commits the row
+        invalidate_summaries(user_id)
 
     return db_value
 
 
+def create_many(
+    db: Session,
+    user_id: int,
+    items: list[schemas.ParamCreate],
+    convert_value: bool = True,
+) -> tuple[list[dict[str, any]], list[dict[str, any]]]:
+    """Insert all valid 'items' with one multi-row INSERT ... RETURNING.
+
+    Returns the created rows and the errors of the invalid items by index.
+    """
+    now = datetime.now(timezone.utc)
+    # ids of the user's aquariums in one query, unknown ids and the ones of
+    # other users are item errors
+    ids = {item.aquarium for item in items if type(item.aquarium) is not str}
+    aquarium_ids = {}
+    if ids:
+        aquarium_ids = {
+            aquarium_id: aquarium_id
+            for aquarium_id in db.scalars(
+                select(models.Aquarium.id)
+                .where(models.Aquarium.user_id == user_id)
+                .where(models.Aquarium.id.in_(ids))
+            )
+        }
+    rows = []
+    errors = []
+
+    for index, item in enumerate(items):
+        try:
+            param_type = _resolve_param_type(item.param_type_name)
+            test_kit = _resolve_test_kit(param_type, item.test_kit_name)
+
+            # resolve each aquarium name only once
+            if item.aquarium not in aquarium_ids:
+                aquarium_db = None
+                if type(item.aquarium) is str:
+                    aquarium_db = aquariums.get_by_name(db, user_id, item.aquarium)
+                if aquarium_db is None:
+                    raise Exception(f"Aquarium '{item.aquarium}' not found")
+                aquarium_ids[item.aquarium] = aquarium_db.id
+
+            value = item.value
+            if convert_value:
+                value = _convert_value(param_type, test_kit, value)
+        except Exception as ex:
+            errors.append({"index": index, "detail": str(ex)})
+            continue
+
+        rows.append(
+            {
+                "user_id": user_id,
+                "param_type_name": param_type.value,
+                "aquarium_id": aquarium_ids[item.aquarium],
+                "test_kit_name": test_kit.value,
+                "value": value,
+                "timestamp": item.timestamp if item.timestamp else now,
+                "created_on": now,
+                "updated_on": now,
+                "note": None,
+            }
+        )
+
+    if len(rows) == 0:
+        return [], errors
+
+    table = models.ParamValue.__table__
+    result = db.execute(insert(table).values(rows).returning(*table.c))
+    created = [row._asdict() for row in result]
+    db.commit()
+    invalidate_summaries(user_id)
+
+    return created, errors
+
+
+def _resolve_param_type(
+    param_type: models.ParamType | schemas.ParamType | str | ParamTypes,
+) -> ParamTypes:
+    # rows or catalog entries, e.g. from get_type
+    if type(param_type) in (models.ParamType, schemas.ParamType):
+        return get_param_type(param_type.name)
+    elif type(param_type) is str:
+        return get_param_type(param_type)
+    return param_type
+
+
+def _resolve_test_kit(
+    param_type: ParamTypes,
+    test_kit: models.TestKit | schemas.TestKit | str | TestKits | None,
+) -> TestKits:
+    if type(test_kit) is str:
+        return get_test_kit(test_kit)
+    elif type(test_kit) in (models.TestKit, schemas.TestKit):
+        return get_test_kit(test_kit.name)
+    elif test_kit is None:
+        return default_test_kits[param_type.value]
+    return test_kit
+
+
+def _convert_value(param_type: ParamTypes, test_kit: TestKits, value: float) -> float:
+    value_converted = convert_unit_for(param_type, test_kit, value)
+    if value_converted is None:
+        raise Exception(_not_supported(param_type, test_kit))
+    return value_converted
+
+
+def _not_supported(param_type: ParamTypes, test_kit: TestKits) -> str:
+    return f"{param_type.value} and/or {test_kit.value} not supported"
+
+
 def get_stats_by_type_last_n_days(
     db: Session, user_id: int, aquarium_name: str, param_type: str, n_days: int
 ):
+    # from the daily rollup, at most one row per day in the window. Readings at
+    # exactly midnight of the first day are counted, the raw scan excluded them.
     sql = text(
         """
-        SELECT COUNT(1) as count, AVG(value) as avg, STDDEV(value) as std
-        FROM param_values
-        LEFT JOIN aquariums ON param_values.aquarium_id =aquariums.id
-        WHERE param_values.user_id = :user_id
-            AND param_type_name = :param_type
-            AND param_values.timestamp > NOW()::DATE - :n_days
-            AND aquariums.name = :aquarium_name  
+        SELECT
+            COALESCE(SUM(s.count), 0) AS count,
+            SUM(s.sum) / NULLIF(SUM(s.count), 0) AS avg,
+            CASE WHEN SUM(s.count) > 1 THEN SQRT(
+                (SUM(s.sum_squares) - SUM(s.sum) * SUM(s.sum) / SUM(s.count))
+                / (SUM(s.count) - 1)
+            ) END AS std
+        FROM param_daily_stats AS s
+        JOIN aquariums ON s.aquarium_id = aquariums.id
+        WHERE s.user_id = :user_id
+            AND s.param_type_name = :param_type
+            AND s.day >= NOW()::DATE - :n_days
+            AND aquariums.name = :aquarium_name
         """
     )
     cols = ["count", "avg", "std"]
@@ -138,6 +291,317 @@ def get_stats_by_type_last_n_days(
     return {}
 
 
+STATS_WINDOWS = (7, 30, 90)
+
+
+def get_stats_by_windows(
+    db: Session,
+    user_id: int,
+    aquarium_name: str,
+    param_type: str | ParamTypes | None = None,
+    windows: tuple[int, ...] = STATS_WINDOWS,
+) -> dict[str, dict[int, dict[str, any]]]:
+    """count, avg, std, min and max over the last N days for each of the
+    'windows' and every param type, in one scan of the daily rollup"""
+    sql, data = _get_stats_by_windows_query(
+        user_id, aquarium_name, param_type, windows
+    )
+    return _to_window_stats(db.execute(sql, data), windows)
+
+
+async def get_stats_by_windows_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium_name: str,
+    param_type: str | ParamTypes | None = None,
+    windows: tuple[int, ...] = STATS_WINDOWS,
+) -> dict[str, dict[int, dict[str, any]]]:
+    sql, data = _get_stats_by_windows_query(
+        user_id, aquarium_name, param_type, windows
+    )
+    return _to_window_stats(await db.execute(sql, data), windows)
+
+
+def _get_stats_by_windows_query(
+    user_id: int,
+    aquarium_name: str,
+    param_type: str | ParamTypes | None,
+    windows: tuple[int, ...],
+) -> tuple[TextClause, dict[str, any]]:
+    # same window start as get_stats_by_type_last_n_days, one FILTER per window
+    columns = []
+    data = {
+        "user_id": user_id,
+        "aquarium_name": aquarium_name,
+        "max_days": max(windows),
+    }
+    for i, n_days in enumerate(windows):
+        data[f"days_{i}"] = n_days
+        where = f"FILTER (WHERE s.day >= NOW()::DATE - CAST(:days_{i} AS INTEGER))"
+        columns += [
+            f"SUM(s.count) {where} AS count_{i}",
+            f"SUM(s.sum) {where} AS sum_{i}",
+            f"SUM(s.sum_squares) {where} AS sum_squares_{i}",
+            f"MIN(s.min) {where} AS min_{i}",
+            f"MAX(s.max) {where} AS max_{i}",
+        ]
+    query = f"""
+    SELECT
+        s.param_type_name,
+        {", ".join(columns)}
+    FROM param_daily_stats AS s
+    JOIN aquariums ON s.aquarium_id = aquariums.id
+    WHERE s.user_id = :user_id
+        AND aquariums.name = :aquarium_name
+        AND s.day >= NOW()::DATE - CAST(:max_days AS INTEGER)
+    """
+    if param_type is not None:
+        if type(param_type) is ParamTypes:
+            param_type = param_type.value
+        query += " AND s.param_type_name = :param_type_name"
+        data["param_type_name"] = param_type
+    query += " GROUP BY s.param_type_name ORDER BY s.param_type_name"
+    return text(query), data
+
+
+def _to_window_stats(
+    result: Result, windows: tuple[int, ...]
+) -> dict[str, dict[int, dict[str, any]]]:
+    out = {}
+    for row in result:
+        stats = {}
+        for i, n_days in enumerate(windows):
+            count = int(getattr(row, f"count_{i}") or 0)
+            total = getattr(row, f"sum_{i}")
+            sum_squares = getattr(row, f"sum_squares_{i}")
+            std = None
+            if count > 1:
+                # exact NUMERIC sums, no cancellation before the sqrt
+                variance = (sum_squares - total * total / count) / (count - 1)
+                std = math.sqrt(max(float(variance), 0.0))
+            minimum, maximum = getattr(row, f"min_{i}"), getattr(row, f"max_{i}")
+            stats[n_days] = {
+                "count": count,
+                "avg": float(total / count) if count > 0 else None,
+                "std": std,
+                "min": float(minimum) if minimum is not None else None,
+                "max": float(maximum) if maximum is not None else None,
+            }
+        out[row.param_type_name] = stats
+    return out
+
+
+def get_summary_by_type(
+    db: Session,
+    user_id: int,
+    aquarium_name: str,
+    param_type: str | ParamTypes | None = None,
+    n_last: int = 2,
+    n_days: int = 7,
+    windows: tuple[int, ...] = (),
+) -> dict[str, dict[str, any]]:
+    """Last 'n_last' values, 'n_days' stats and the time-weighted sums of
+    each of the 'windows' (in days) for all param types in one query"""
+    sql, data = _get_summary_by_type_query(
+        user_id, aquarium_name, param_type, n_last, n_days, windows
+    )
+    return _to_summaries(db.execute(sql, data), data, windows)
+
+
+async def get_summary_by_type_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium_name: str,
+    param_type: str | ParamTypes | None = None,
+    n_last: int = 2,
+    n_days: int = 7,
+    windows: tuple[int, ...] = (),
+) -> dict[str, dict[str, any]]:
+    sql, data = _get_summary_by_type_query(
+        user_id, aquarium_name, param_type, n_last, n_days, windows
+    )
+    return _to_summaries(await db.execute(sql, data), data, windows)
+
+
+def _get_summary_by_type_query(
+    user_id: int,
+    aquarium_name: str,
+    param_type: str | ParamTypes | None,
+    n_last: int,
+    n_days: int,
+    windows: tuple[int, ...],
+) -> tuple[TextClause, dict[str, any]]:
+    query = """
+    WITH ranked AS (
+        SELECT
+            p.id,
+            p.param_type_name,
+            p.value,
+            p.timestamp,
+            ROW_NUMBER() OVER w AS rn
+        FROM param_values AS p
+        JOIN aquariums ON p.aquarium_id = aquariums.id
+        WHERE p.user_id = :user_id
+            AND aquariums.name = :aquarium_name
+    """
+    if param_type is not None:
+        if type(param_type) is ParamTypes:
+            param_type = param_type.value
+        query += " AND p.param_type_name = :param_type_name"
+    query += """
+        WINDOW w AS (
+            PARTITION BY p.param_type_name ORDER BY p.timestamp DESC, p.id DESC
+        )
+    )
+    """
+    # windows start at midnight UTC, like the cache key of the summaries
+    today = datetime.combine(datetime.now(timezone.utc).date(), datetime.min.time())
+    data = {
+        "user_id": user_id,
+        "aquarium_name": aquarium_name,
+        "param_type_name": param_type,
+        "n_last": n_last,
+        "n_days": n_days,
+    }
+    if windows:
+        query += _get_window_sums_query(data, param_type, windows, today)
+    query += """
+    SELECT * FROM (
+        SELECT
+            param_type_name,
+            ARRAY_AGG(value ORDER BY timestamp DESC, id DESC)
+                FILTER (WHERE rn <= :n_last) AS values,
+            ARRAY_AGG(id ORDER BY timestamp DESC, id DESC)
+                FILTER (WHERE rn <= :n_last) AS ids,
+            ARRAY_AGG(timestamp ORDER BY timestamp DESC, id DESC)
+                FILTER (WHERE rn <= :n_last) AS timestamps,
+            COUNT(1) FILTER (WHERE timestamp > NOW()::DATE - CAST(:n_days AS INTEGER)) AS count,
+            AVG(value) FILTER (WHERE timestamp > NOW()::DATE - CAST(:n_days AS INTEGER)) AS avg,
+            STDDEV(value) FILTER (WHERE timestamp > NOW()::DATE - CAST(:n_days AS INTEGER)) AS std
+        FROM ranked
+        GROUP BY param_type_name
+    ) AS summary
+    """
+    if windows:
+        query += " LEFT JOIN window_sums USING (param_type_name)"
+    query += " ORDER BY param_type_name"
+    return text(query), data
+
+
+def _get_window_sums_query(
+    data: dict[str, any],
+    param_type: str | None,
+    windows: tuple[int, ...],
+    today: datetime,
+) -> str:
+    # Only the readings since the start of the largest window and the one
+    # before it (still in effect at the start) are read, from the index.
+    # next_timestamp: LAG over the descending order, the time of the reading
+    # after this one, which holds until then. The sums of a window cover these
+    # closed intervals, the last reading holds until now which is only known when
+    # the summary is read. Values are summed as differences to the last one,
+    # smaller numbers for the variance and nothing to add for the last reading.
+    query = """,
+    window_bounds AS (
+        SELECT
+            aquariums.id AS aquarium_id,
+            param_types.name AS param_type_name,
+            COALESCE(
+                (
+                    SELECT MAX(b.timestamp)
+                    FROM param_values AS b
+                    WHERE b.user_id = :user_id
+                        AND b.aquarium_id = aquariums.id
+                        AND b.param_type_name = param_types.name
+                        AND b.timestamp <= :window_start
+                ),
+                :window_start
+            ) AS start
+        FROM aquariums
+        CROSS JOIN param_types
+        WHERE aquariums.user_id = :user_id
+            AND aquariums.name = :aquarium_name
+    """
+    if param_type is not None:
+        query += " AND param_types.name = :param_type_name"
+    query += """
+    ), window_readings AS (
+        SELECT
+            p.param_type_name,
+            p.value,
+            p.timestamp,
+            LAG(p.timestamp) OVER w AS next_timestamp,
+            FIRST_VALUE(p.value) OVER w AS last_value
+        FROM window_bounds
+        -- OFFSET 0 keeps the planner from flattening the subquery, an index
+        -- range scan per param type instead of all the readings of the user
+        CROSS JOIN LATERAL (
+            SELECT *
+            FROM param_values
+            WHERE param_values.user_id = :user_id
+                AND param_values.aquarium_id = window_bounds.aquarium_id
+                AND param_values.param_type_name = window_bounds.param_type_name
+                AND param_values.timestamp >= window_bounds.start
+            OFFSET 0
+        ) AS p
+        WINDOW w AS (
+            PARTITION BY p.param_type_name ORDER BY p.timestamp DESC, p.id DESC
+        )
+    ), window_sums AS (
+        SELECT param_type_name
+    """
+    delta = "CAST(value - last_value AS FLOAT8)"
+    for i, n_days_window in enumerate(windows):
+        # part of each interval after the window start, in seconds
+        duration = f"""date_part(
+            'epoch', next_timestamp - GREATEST(timestamp, :window_start_{i}))"""
+        where = f"FILTER (WHERE next_timestamp > :window_start_{i})"
+        query += f""",
+        SUM({duration}) {where} AS duration_{i},
+        SUM({duration} * {delta}) {where} AS weighted_sum_{i},
+        SUM({duration} * {delta} * {delta}) {where} AS weighted_sum_squares_{i}
+        """
+        data[f"window_start_{i}"] = today - timedelta(days=n_days_window)
+    query += """
+        FROM window_readings
+        GROUP BY param_type_name
+    )
+    """
+    data["window_start"] = today - timedelta(days=max(windows))
+    return query
+
+
+def _to_summaries(
+    result: Result, data: dict[str, any], windows: tuple[int, ...]
+) -> dict[str, dict[str, any]]:
+    out = {}
+    for row in result:
+        out[row.param_type_name] = {
+            "values": [float(value) for value in row.values],
+            "ids": [int(id) for id in row.ids],
+            "timestamps": list(row.timestamps),
+            "count": int(row.count),
+            "avg": float(row.avg) if row.avg is not None else None,
+            "std": float(row.std) if row.std is not None else None,
+            # sums over the intervals between readings since the window start
+            # (seconds since the epoch) of the differences to values[0]
+            "windows": {
+                n_days_window: {
+                    "start": data[f"window_start_{i}"]
+                    .replace(tzinfo=timezone.utc)
+                    .timestamp(),
+                    "duration": getattr(row, f"duration_{i}") or 0.0,
+                    "weighted_sum": getattr(row, f"weighted_sum_{i}") or 0.0,
+                    "weighted_sum_squares": (
+                        getattr(row, f"weighted_sum_squares_{i}") or 0.0
+                    ),
+                }
+                for i, n_days_window in enumerate(windows)
+            },
+        }
+    return out
+
+
 def get_by_type(
     db: Session,
     user_id: int,
@@ -146,32 +610,72 @@ def get_by_type(
     days: int | None = None,
     limit: int | None = None,
     offset: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
 ) -> list[schemas.ParamInfo]:
-    cols = schemas.ParamInfo.get_fields()
+    sql, data = _get_by_type_query(
+        user_id, aquarium, param_type, days, limit, offset, cursor
+    )
+    return _to_param_infos(db.execute(sql, data))
+
+
+async def get_by_type_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes = None,
+    days: int | None = None,
+    limit: int | None = None,
+    offset: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
+) -> list[schemas.ParamInfo]:
+    sql, data = _get_by_type_query(
+        user_id, aquarium, param_type, days, limit, offset, cursor
+    )
+    return _to_param_infos(await db.execute(sql, data))
+
+
+def _get_by_type_query(
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes | None,
+    days: int | None,
+    limit: int | None,
+    offset: int | None,
+    cursor: tuple[datetime, int] | None,
+) -> tuple[TextClause, dict[str, any]]:
+    # display names and units come from the catalog, see _to_param_infos
     query = """
-    SELECT 
-        p.id, 
-        p.param_type_name, 
-        param_types.display_name AS param_type_display_name, 
-        p.test_kit_name, 
-        t.display_name AS test_kit_display_name, 
+    SELECT
+        p.id,
+        p.param_type_name,
+        p.test_kit_name,
         p.value,
-        param_types.unit, 
-        p.timestamp, 
+        p.timestamp,
         p.note,
         p.created_on,
         p.updated_on
     FROM param_values AS p
-    LEFT JOIN test_kits AS t ON p.test_kit_name = t.name
-    LEFT JOIN param_types ON p.param_type_name = param_types.name
-    LEFT JOIN aquariums ON p.aquarium_id =aquariums.id
-    WHERE p.user_id = :user_id
-        AND aquariums.name = :aquarium_name
     """
     if param_type is not None:
         if type(param_type) is ParamTypes:
             param_type = param_type.value
-        query += " AND p.param_type_name = :param_type_name"
+        query += """
+        JOIN aquariums ON p.aquarium_id = aquariums.id
+        WHERE p.user_id = :user_id
+            AND aquariums.name = :aquarium_name
+            AND p.param_type_name = :param_type_name
+        """
+    else:
+        # with the aquarium id a constant for the planner, pages over all types
+        # walk the (user, aquarium, timestamp, id) index in order, no sort
+        query += """
+        WHERE p.user_id = :user_id
+            AND p.aquarium_id = (
+                SELECT id FROM aquariums
+                WHERE user_id = :user_id AND name = :aquarium_name
+                LIMIT 1
+            )
+        """
 
     data = {
         "param_type_name": param_type,
@@ -179,10 +683,14 @@ def get_by_type(
         "aquarium_name": aquarium,
     }
     if days is not None:
-        query += " AND p.timestamp > current_date - interval ':days' day"
+        query += " AND p.timestamp > current_date - make_interval(days => :days)"
         data["days"] = days
+    if cursor is not None:
+        # keyset pagination: start right after the last row of the previous page
+        query += " AND (p.timestamp, p.id) < (:cursor_timestamp, :cursor_id)"
+        data["cursor_timestamp"], data["cursor_id"] = cursor
 
-    query += " ORDER BY p.timestamp DESC"
+    query += " ORDER BY p.timestamp DESC, p.id DESC"
 
     if limit is not None:
         query += " LIMIT :limit"
@@ -191,11 +699,112 @@ def get_by_type(
         query += " OFFSET :offset"
         data["offset"] = offset
 
-    sql = text(query)
-    result = db.execute(sql, data)
-    out = []
-    for row in result:
-        out.append(schemas.ParamInfo(**{cols[i]: item for i, item in enumerate(row)}))
+    return text(query), data
+
+
+def _to_param_infos(result: Result) -> list[schemas.ParamInfo]:
+    catalog = get_catalog()
+    return [_to_param_info(catalog, row) for row in result]
+
+
+def _to_param_info(catalog: Catalog, row) -> schemas.ParamInfo:
+    return schemas.ParamInfo(
+        id=row.id,
+        param_type_name=row.param_type_name,
+        param_type_display_name=catalog.param_type_display_name(row.param_type_name),
+        test_kit_name=row.test_kit_name,
+        test_kit_display_name=catalog.test_kit_display_name(row.test_kit_name),
+        value=row.value,
+        unit=catalog.param_type_unit(row.param_type_name),
+        timestamp=row.timestamp,
+        note=row.note,
+        created_on=row.created_on,
+        updated_on=row.updated_on,
+    )
+
+
+def get_by_type_columnar(
+    db: Session,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes = None,
+    days: int | None = None,
+    limit: int | None = None,
+    offset: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
+) -> dict[str, any]:
+    """Same rows as 'get_by_type' as parallel arrays, display names and units
+    are returned once per param type and test kit"""
+    sql, data = _get_by_type_query(
+        user_id, aquarium, param_type, days, limit, offset, cursor
+    )
+    return _to_param_columns(db.execute(sql, data))
+
+
+async def get_by_type_columnar_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes = None,
+    days: int | None = None,
+    limit: int | None = None,
+    offset: int | None = None,
+    cursor: tuple[datetime, int] | None = None,
+) -> dict[str, any]:
+    sql, data = _get_by_type_query(
+        user_id, aquarium, param_type, days, limit, offset, cursor
+    )
+    return _to_param_columns(await db.execute(sql, data))
+
+
+def _to_param_columns(result: Result) -> dict[str, any]:
+    rows = result.all()
+    # transpose rows to columns, in the order of the SELECT in _get_by_type_query
+    (
+        ids,
+        param_type_names,
+        test_kit_names,
+        values,
+        timestamps,
+        notes,
+        created_on,
+        updated_on,
+    ) = list(zip(*rows)) if rows else [()] * 8
+    catalog = get_catalog()
+    return {
+        "ids": list(ids),
+        "param_type_names": list(param_type_names),
+        "test_kit_names": list(test_kit_names),
+        "values": [float(value) for value in values],
+        "timestamps": list(timestamps),
+        "notes": list(notes),
+        "created_on": list(created_on),
+        "updated_on": list(updated_on),
+        "param_types": {
+            name: {
+                "display_name": catalog.param_type_display_name(name),
+                "unit": catalog.param_type_unit(name),
+            }
+            for name in param_type_names
+        },
+        "test_kits": {
+            name: {"display_name": catalog.test_kit_display_name(name)}
+            for name in test_kit_names
+        },
+    }
+
+
+def truncate_param_columns(columns: dict[str, any], n: int) -> dict[str, any]:
+    """First 'n' rows of 'get_by_type_columnar' output"""
+    out = {
+        key: value[:n] for key, value in columns.items() if type(value) is list
+    }
+    out["param_types"] = {
+        name: columns["param_types"][name] for name in out["param_type_names"]
+    }
+    out["test_kits"] = {
+        name: columns["test_kits"][name] for name in out["test_kit_names"]
+    }
     return out
 
 
@@ -206,12 +815,31 @@ def get_count_by_type(
     param_type: str | ParamTypes = None,
     days: int | None = None,
 ):
+    sql, data = _get_count_by_type_query(user_id, aquarium, param_type, days)
+    return {"count": db.execute(sql, data).scalar()}
+
+
+async def get_count_by_type_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes = None,
+    days: int | None = None,
+):
+    sql, data = _get_count_by_type_query(user_id, aquarium, param_type, days)
+    return {"count": (await db.execute(sql, data)).scalar()}
+
+
+def _get_count_by_type_query(
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes | None,
+    days: int | None,
+) -> tuple[TextClause, dict[str, any]]:
     query = """
     SELECT COUNT(p.id)
     FROM param_values AS p
-    LEFT JOIN test_kits AS t ON p.test_kit_name = t.name
-    LEFT JOIN param_types ON p.param_type_name = param_types.name
-    LEFT JOIN aquariums ON p.aquarium_id =aquariums.id
+    JOIN aquariums ON p.aquarium_id = aquariums.id
     WHERE p.user_id = :user_id
         AND aquariums.name = :aquarium_name
     """
@@ -226,41 +854,49 @@ def get_count_by_type(
         "aquarium_name": aquarium,
     }
     if days is not None:
-        query += " AND p.timestamp > current_date - interval ':days' day"
+        query += " AND p.timestamp > current_date - make_interval(days => :days)"
         data["days"] = days
-    sql = text(query)
-    result = db.execute(sql, data)
-    data = [row for row in result]
-    return {"count": data[0][0]}
+    return text(query), data
 
 
 def get_param_by_id(db: Session, user_id: int, param_id: int) -> schemas.ParamInfo:
-    cols = schemas.ParamInfo.get_fields()
+    sql, data = _get_param_by_id_query(user_id, param_id)
+    return _to_param_info_or_empty(db.execute(sql, data))
+
+
+async def get_param_by_id_async(
+    db: AsyncSession, user_id: int, param_id: int
+) -> schemas.ParamInfo:
+    sql, data = _get_param_by_id_query(user_id, param_id)
+    return _to_param_info_or_empty(await db.execute(sql, data))
+
+
+def _get_param_by_id_query(
+    user_id: int, param_id: int
+) -> tuple[TextClause, dict[str, any]]:
     sql = text(
         """
-        SELECT 
-            v.id, 
-            v.param_type_name, 
-            param_types.display_name AS param_type_display_name,
-            t.name AS test_kit_name, 
-            t.display_name AS test_kit_display_name, 
-            v.value, 
-            param_types.unit AS unit,
-            v.timestamp, 
+        SELECT
+            v.id,
+            v.param_type_name,
+            v.test_kit_name,
+            v.value,
+            v.timestamp,
             v.note,
             v.created_on,
             v.updated_on
         FROM param_values AS v
-        LEFT JOIN test_kits AS t ON v.test_kit_name = t.name 
-        LEFT JOIN param_types ON v.param_type_name = param_types.name
         WHERE user_id = :user_id and id = :param_id
         LIMIT 1;
         """
     )
-    result = db.execute(sql, {"param_id": param_id, "user_id": user_id})
+    return sql, {"param_id": param_id, "user_id": user_id}
+
+
+def _to_param_info_or_empty(result: Result) -> schemas.ParamInfo:
     data = [row for row in result]
     if len(data) == 1:
-        return schemas.ParamInfo(**{cols[i]: item for i, item in enumerate(data[0])})
+        return _to_param_info(get_catalog(), data[0])
     return schemas.ParamInfo()
 
 
@@ -272,6 +908,7 @@ def delete_by_id(db: Session, user_id: int, param_id: int):
         .delete()
     )
     db.commit()
+    invalidate_summaries(user_id)
     return rows
 
 
@@ -288,13 +925,310 @@ def update_by_id(
     if note is not None:
         updates[models.ParamValue.note] = note
 
-    db.query(models.ParamValue).filter(models.ParamValue.user_id == user_id).filter(
-        models.ParamValue.id == param_id
-    ).update(updates)
+    # UPDATE ... RETURNING, populate_existing so an instance already in the
+    # session gets the db values too
+    db_value = db.scalar(
+        update(models.ParamValue)
+        .where(models.ParamValue.user_id == user_id)
+        .where(models.ParamValue.id == param_id)
+        .values(updates)
+        .returning(models.ParamValue)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
     db.commit()
-    return (
-        db.query(models.ParamValue)
-        .filter(models.ParamValue.user_id == user_id)
-        .filter(models.ParamValue.id == param_id)
-        .first()
+    invalidate_summaries(user_id)
+    return db_value
+
+
+EXPORT_FORMATS = ["csv", "ndjson"]
+
+
+def stream_export(
+    user_id: int,
+    aquarium: str | None = None,
+    param_type: str | ParamTypes | None = None,
+    format: str = "csv",
+) -> Iterator[bytes]:
+    """Stream all params of a user as CSV or NDJSON directly from COPY"""
+    if format not in EXPORT_FORMATS:
+        raise Exception(f"Export format '{format}' not supported")
+
+    query = """
+    SELECT
+        p.id,
+        aquariums.name AS aquarium,
+        p.param_type_name,
+        p.test_kit_name,
+        p.value,
+        p.note,
+        p.timestamp,
+        p.created_on,
+        p.updated_on
+    FROM param_values AS p
+    JOIN aquariums ON p.aquarium_id = aquariums.id
+    WHERE p.user_id = %(user_id)s
+    """
+    if aquarium is not None:
+        query += " AND aquariums.name = %(aquarium)s"
+    if param_type is not None:
+        if type(param_type) is ParamTypes:
+            param_type = param_type.value
+        query += " AND p.param_type_name = %(param_type_name)s"
+    query += " ORDER BY p.timestamp, p.id"
+
+    if format == "csv":
+        sql = f"COPY ({query}) TO STDOUT WITH CSV HEADER"
+    else:
+        # one json object per line, quote and delimiter are control characters
+        # which json always escapes so that COPY outputs the json as is
+        sql = f"""
+        COPY (SELECT row_to_json(t) FROM ({query}) AS t)
+        TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')
+        """
+
+    return stream_copy_to(
+        sql,
+        {"user_id": user_id, "aquarium": aquarium, "param_type_name": param_type},
     )
+
+
+IMPORT_COLUMNS = [
+    "user_id",
+    "aquarium_id",
+    "param_type_name",
+    "test_kit_name",
+    "value",
+    "note",
+    "timestamp",
+    "created_on",
+    "updated_on",
+]
+# errors kept by import_csv, the others are only counted
+MAX_IMPORT_ERRORS = 100
+
+
+def import_csv(
+    db: Session,
+    user_id: int,
+    aquarium_id: int,
+    file: BinaryIO,
+    convert_value: bool = True,
+    chunk_rows: int = 10000,
+    max_errors: int = MAX_IMPORT_ERRORS,
+) -> tuple[int, list[dict[str, any]], int]:
+    """Import params from a CSV file with COPY FROM STDIN, 'chunk_rows' at a time.
+
+    Expected columns: param_type_name, value, timestamp and optionally
+    test_kit_name and note. Invalid rows are skipped, the first 'max_errors'
+    are returned with their line number along with the number of invalid
+    rows. Everything is imported in one transaction.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    missing = {"param_type_name", "value", "timestamp"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    copy_sql = f"COPY param_values ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH CSV"
+    conn = db.connection().connection
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    n_buffered = 0
+    n_imported = 0
+    errors = []
+    n_errors = 0
+
+    def copy_buffer():
+        buffer.seek(0)
+        with conn.cursor() as cur:
+            cur.copy_expert(copy_sql, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    for row in reader:
+        try:
+            param_type = get_param_type(row["param_type_name"].strip())
+            test_kit = _resolve_test_kit(param_type, row.get("test_kit_name") or None)
+            value = float(row["value"])
+            if not math.isfinite(value):
+                raise ValueError(f"Invalid value '{row['value']}'")
+            if convert_value:
+                value = _convert_value(param_type, test_kit, value)
+            timestamp = datetime.fromisoformat(row["timestamp"].strip())
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        except Exception as ex:
+            n_errors += 1
+            if len(errors) < max_errors:
+                errors.append({"line": reader.line_num, "detail": str(ex)})
+            continue
+
+        writer.writerow(
+            [
+                user_id,
+                aquarium_id,
+                param_type.value,
+                test_kit.value,
+                value,
+                row.get("note") or None,
+                timestamp.isoformat(),
+                now.isoformat(),
+                now.isoformat(),
+            ]
+        )
+        n_buffered += 1
+        if n_buffered == chunk_rows:
+            copy_buffer()
+            n_imported += n_buffered
+            n_buffered = 0
+
+    if n_buffered > 0:
+        copy_buffer()
+        n_imported += n_buffered
+
+    db.commit()
+    invalidate_summaries(user_id)
+    return n_imported, errors, n_errors
+
+
+SERIES_BUCKETS = ("day", "week", "month")
+
+
+def get_series_buckets(
+    db: Session,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes,
+    bucket: str,
+    days: int | None = None,
+) -> list[dict[str, any]]:
+    """min, max, avg, last value and count of 'param_type' per calendar 'bucket'"""
+    sql, data = _get_series_buckets_query(user_id, aquarium, param_type, bucket, days)
+    return _to_series_buckets(db.execute(sql, data))
+
+
+async def get_series_buckets_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes,
+    bucket: str,
+    days: int | None = None,
+) -> list[dict[str, any]]:
+    sql, data = _get_series_buckets_query(user_id, aquarium, param_type, bucket, days)
+    return _to_series_buckets(await db.execute(sql, data))
+
+
+def _get_series_buckets_query(
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes,
+    bucket: str,
+    days: int | None,
+) -> tuple[TextClause, dict[str, any]]:
+    if bucket not in SERIES_BUCKETS:
+        raise ValueError(f"Bucket should be one of: {', '.join(SERIES_BUCKETS)}")
+    if type(param_type) is ParamTypes:
+        param_type = param_type.value
+
+    query = """
+    SELECT
+        date_trunc(CAST(:bucket AS TEXT), p.timestamp) AS timestamp,
+        MIN(p.value) AS min,
+        MAX(p.value) AS max,
+        AVG(p.value) AS avg,
+        (ARRAY_AGG(p.value ORDER BY p.timestamp DESC, p.id DESC))[1] AS last,
+        COUNT(1) AS count
+    FROM param_values AS p
+    JOIN aquariums ON p.aquarium_id = aquariums.id
+    WHERE p.user_id = :user_id
+        AND aquariums.name = :aquarium_name
+        AND p.param_type_name = :param_type_name
+    """
+    data = {
+        "bucket": bucket,
+        "user_id": user_id,
+        "aquarium_name": aquarium,
+        "param_type_name": param_type,
+    }
+    if days is not None:
+        query += " AND p.timestamp > current_date - make_interval(days => :days)"
+        data["days"] = days
+    query += " GROUP BY 1 ORDER BY 1"
+    return text(query), data
+
+
+def _to_series_buckets(result: Result) -> list[dict[str, any]]:
+    return [
+        {
+            "timestamp": row.timestamp,
+            "min": float(row.min),
+            "max": float(row.max),
+            "avg": float(row.avg),
+            "last": float(row.last),
+            "count": int(row.count),
+        }
+        for row in result
+    ]
+
+
+def get_series_values(
+    db: Session,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes,
+    days: int | None = None,
+) -> tuple[list[int], list[datetime], list[float]]:
+    """ids, timestamps and values of 'param_type' in chronological order"""
+    sql, data = _get_series_values_query(user_id, aquarium, param_type, days)
+    return _to_series_values(db.execute(sql, data))
+
+
+async def get_series_values_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes,
+    days: int | None = None,
+) -> tuple[list[int], list[datetime], list[float]]:
+    sql, data = _get_series_values_query(user_id, aquarium, param_type, days)
+    return _to_series_values(await db.execute(sql, data))
+
+
+def _get_series_values_query(
+    user_id: int,
+    aquarium: str,
+    param_type: str | ParamTypes,
+    days: int | None,
+) -> tuple[TextClause, dict[str, any]]:
+    if type(param_type) is ParamTypes:
+        param_type = param_type.value
+
+    query = """
+    SELECT p.id, p.timestamp, p.value
+    FROM param_values AS p
+    JOIN aquariums ON p.aquarium_id = aquariums.id
+    WHERE p.user_id = :user_id
+        AND aquariums.name = :aquarium_name
+        AND p.param_type_name = :param_type_name
+    """
+    data = {
+        "user_id": user_id,
+        "aquarium_name": aquarium,
+        "param_type_name": param_type,
+    }
+    if days is not None:
+        query += " AND p.timestamp > current_date - make_interval(days => :days)"
+        data["days"] = days
+    query += " ORDER BY p.timestamp, p.id"
+    return text(query), data
+
+
+def _to_series_values(result: Result) -> tuple[list[int], list[datetime], list[float]]:
+    ids, timestamps, values = [], [], []
+    for row in result:
+        ids.append(row.id)
+        timestamps.append(row.timestamp)
+        values.append(float(row.value))
+    return ids, timestamps, values
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, Pool
+
+
+class PoolWaitStats:
+    """Time spent checking a connection out of a pool, opening new connections included"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(self, wait_secs: float, timed_out: bool = False):
+        with self._lock:
+            self._checkouts += 1
+            self._total_wait += wait_secs
+            self._max_wait = max(self._max_wait, wait_secs)
+            if timed_out:
+                self._timeouts += 1
+
+    def clear(self):
+        with self._lock:
+            self._checkouts = 0
+            self._total_wait = 0.0
+            self._max_wait = 0.0
+            self._timeouts = 0
+
+    def stats(self) -> dict[str, any]:
+        with self._lock:
+            return {
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_total_ms": self._total_wait * 1000,
+                "wait_avg_ms": (
+                    self._total_wait * 1000 / self._checkouts
+                    if self._checkouts
+                    else 0.0
+                ),
+                "wait_max_ms": self._max_wait * 1000,
+            }
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        # keep counting across engine.dispose()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_stats(pool: Pool) -> dict[str, any]:
+    """Checked-out, overflow and checkout wait time of an engine's pool"""
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                # negative until all 'size' connections have been opened
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.stats())
+    return stats
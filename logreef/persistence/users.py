@@ -1,10 +1,22 @@
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
 
 from logreef.persistence import models
+from logreef.persistence.database import add_to_db
 from logreef.security import hash_password, verify_password
+from logreef.cache import TTLCache
+from logreef.config import get_config, ConfigAPI
+from logreef import schemas
+
+# verified users by email, used to authenticate requests without a db query
+user_cache = TTLCache(
+    max_size=int(get_config(ConfigAPI.USER_CACHE_MAX_SIZE, 10000)),
+    ttl=float(get_config(ConfigAPI.USER_CACHE_TTL_SECONDS, 60)),
+)
+
 
 def create(
     db: Session,
@@ -34,11 +46,7 @@ def create(
         avatar_url=avatar_url
     )
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    return db_user
+    return add_to_db(db, db_user)
 
 
 def get_by_username(db: Session, username: str):
@@ -53,6 +61,40 @@ def get_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 
+def get_verified_by_email(db: Session, email: str) -> schemas.User | None:
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    user_db = get_by_email(db, email)
+    if user_db is None or not user_db.verified:
+        return None
+    user = schemas.User.model_validate(user_db)
+    user_cache.set(email, user)
+    return user
+
+
+async def get_verified_by_email_async(
+    db: AsyncSession, email: str
+) -> schemas.User | None:
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user_db = result.scalars().first()
+    if user_db is None or not user_db.verified:
+        return None
+    user = schemas.User.model_validate(user_db)
+    user_cache.set(email, user)
+    return user
+
+
+def invalidate_cache(user_id: int | None = None, email: str | None = None):
+    if email is not None:
+        user_cache.pop(email)
+    if user_id is not None:
+        user_cache.pop_where(lambda _, user: user.id == user_id)
+
+
 def authenticate(db: Session, email: str, password: str) -> models.User | bool:
     user = get_by_email(db, email)
     if not user:
@@ -72,20 +114,38 @@ def update_by_id(
     updates = {}
     if last_login_on is not None:
         updates[models.User.last_login_on] = datetime.now(timezone.utc)
-    db.query(models.User).filter(models.User.id == user_id).update(updates)
+    _update_returning(db, models.User.id == user_id, updates)
     db.commit()
+    invalidate_cache(user_id=user_id)
     return True
 
 
 def update_password(db: Session, user_id: int, new_password: str):
     hash_new_password  = hash_password(new_password)
-    db.query(models.User).filter(models.User.id == user_id).update({models.User.hash_password: hash_new_password})
+    _update_returning(
+        db, models.User.id == user_id, {models.User.hash_password: hash_new_password}
+    )
     db.commit()
+    invalidate_cache(user_id=user_id)
     return True
 
 
 def set_to_verified(db: Session, email: str):
-    sql = text("UPDATE users SET verified = TRUE WHERE email = :email")
-    _ = db.execute(sql, {"email": email})
+    _update_returning(db, models.User.email == email, {models.User.verified: True})
     db.commit()
+    invalidate_cache(email=email)
     return True
+
+
+def _update_returning(db: Session, where, updates: dict):
+    # UPDATE ... RETURNING refreshes the users already in the session in the
+    # same round trip, commit doesn't expire them
+    if not updates:
+        return
+    db.scalars(
+        update(models.User)
+        .where(where)
+        .values(updates)
+        .returning(models.User)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    ).all()
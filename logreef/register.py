@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 
 from logreef.persistence import users, aquariums
+from logreef.security import PasswordPoolSaturated
 
 DEFAULT_AQUARIUM_NAME = "Default"
 
@@ -25,6 +26,8 @@ def register_user(
             avatar_url=avatar_url,
             verified=True if google else False
         )
+    except PasswordPoolSaturated:
+        raise
     except Exception as ex:
         return False, {"detail": "Email already used. Try logging in."}
 
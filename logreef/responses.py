@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from logreef.persistence.database import Base
+
+
+def _default(obj):
+    # same output as fastapi's jsonable_encoder for the types orjson doesn't know
+    if isinstance(obj, Decimal):
+        # Numeric columns, e.g. param_values.value
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Base):
+        # loaded column attributes only, like jsonable_encoder on ORM objects
+        return {
+            key: value for key, value in vars(obj).items() if not key.startswith("_sa")
+        }
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson.
+
+    Routes returning it directly skip fastapi's jsonable_encoder pass, which
+    walks every value of large list responses in Python.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already holds 'etag'"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
@@ -3,14 +3,16 @@ import os
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import text
 from azure.storage.blob import BlobServiceClient
 
-from logreef.persistence import users
+from logreef.persistence import users, params
 from logreef.user import get_current_user
 from logreef import schemas
-from logreef.persistence.database import get_session, Session
+from logreef.persistence.database import get_session, Session, engine, async_engine
+from logreef.persistence.pool import get_pool_stats
 from logreef.config import ConfigAPI, get_config
-from logreef.security import create_email_confirmation_token
+from logreef.security import create_email_confirmation_token, token_cache
 
 
 BLOB_CONTAINER_NAME = "thereeflog"
@@ -56,24 +58,26 @@ def daily_demo_user_update(
     username: str = "demo",
 ):
     check_for_admin(current_user)
-    query = f"""UPDATE param_values
+    query = text(
+        """UPDATE param_values
         SET timestamp = timestamp + INTERVAL '1 day'
         FROM users
         WHERE param_values.user_id = users.id
-        AND users.username = '{username}';
-    """
+        AND users.username = :username;
+        """
+    )
     try:
-        conn = db.connection().connection
-        with conn.cursor() as cur:
-            cur.execute(query)
-            conn.commit()
+        db.execute(query, {"username": username})
+        db.commit()
+        user = users.get_by_username(db, username)
+        if user is not None:
+            params.invalidate_summaries(user.id)
     except Exception as ex:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Demo user update failed",
         )
-    finally:
-        conn.close()
     return {
         "detail": "Updated user demo",
     }
@@ -87,19 +91,24 @@ def backup_user(
 ):
     check_for_admin(current_user)
 
-    query = f"""
+    query = """
         SELECT param_values.* FROM param_values
         JOIN users ON param_values.user_id = users.id
-        WHERE users.username = '{username}'
+        WHERE users.username = %(username)s
     """
 
     filename = f"{username}-{datetime.now(timezone.utc).strftime('%Y%m%d')}.csv"
 
     try:
+        # the DBAPI connection stays owned by the session, it goes back to the pool
+        # when the session closes
         conn = db.connection().connection
         with conn.cursor() as cur:
+            copy = cur.mogrify(
+                f"COPY ({query}) TO STDOUT WITH CSV HEADER", {"username": username}
+            )
             with open(filename, "w") as f:
-                cur.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV HEADER", f)
+                cur.copy_expert(copy.decode(), f)
 
         # save to storage account
         blob_service_client = BlobServiceClient.from_connection_string(
@@ -116,7 +125,6 @@ def backup_user(
             detail="Data backup failed",
         )
     finally:
-        conn.close()
         if os.path.exists(filename):
             os.remove(filename)
     return {
@@ -126,6 +134,29 @@ def backup_user(
     }
 
 
+@router.get("/cache-stats")
+def get_cache_stats(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+):
+    check_for_admin(current_user)
+    return {
+        "users": users.user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "summaries": params.summary_cache.stats(),
+    }
+
+
+@router.get("/pool-stats")
+def get_db_pool_stats(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+):
+    check_for_admin(current_user)
+    return {
+        "sync": get_pool_stats(engine.pool),
+        "async": get_pool_stats(async_engine.pool),
+    }
+
+
 @router.get("/confirmation-token")
 def generate_confirmation_token(
     current_user: Annotated[schemas.User, Depends(get_current_user)],
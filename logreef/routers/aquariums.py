@@ -3,9 +3,14 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from logreef import schemas
-from logreef.user import get_current_user, check_for_demo
-from logreef.persistence.database import Session, get_session
-from logreef.persistence import aquariums
+from logreef.user import get_current_user, get_current_user_async, check_for_demo
+from logreef.persistence.database import (
+    Session,
+    get_session,
+    AsyncSession,
+    get_async_session,
+)
+from logreef.persistence import aquariums, params
 
 router = APIRouter()
 
@@ -27,11 +32,11 @@ def create_aquarium(
 
 
 @router.get("")
-def get_aquariums(
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
-    db: Session = Depends(get_session),
+async def get_aquariums(
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_session),
 ):
-    return aquariums.get_all(db, current_user.id)
+    return await aquariums.get_all_async(db, current_user.id)
 
 
 @router.put("/{aquarium_id}")
@@ -54,6 +59,8 @@ def delete_aquarium_by_id(
     check_for_demo(current_user)
     try:
         deleted = aquariums.delete_by_id(db, current_user.id, aquarium_id)
+        # its params are gone, a new aquarium could reuse the name
+        params.invalidate_summaries(current_user.id)
     except:
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="Error while trying to delete aquarium"
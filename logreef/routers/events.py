@@ -0,0 +1,139 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from logreef import schemas
+from logreef.persistence.database import (
+    get_session,
+    get_async_session,
+    Session,
+    AsyncSession,
+)
+from logreef.user import get_current_user, get_current_user_async, check_for_demo
+from logreef.persistence import events
+from logreef.pagination import encode_cursor, decode_cursor
+from logreef.responses import ORJSONResponse
+
+router = APIRouter()
+
+MAX_BULK_DOSINGS = 1000
+
+
+def _decode_cursor(cursor: str, limit: int | None):
+    if limit is not None and limit < 1:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="'limit' must be positive"
+        )
+    try:
+        # an empty cursor requests the first page
+        return decode_cursor(cursor) if cursor else None
+    except ValueError as ex:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ex))
+
+
+@router.get("/")
+async def get_timeline(
+    aquarium: str,
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    days: int | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    if cursor is None:
+        return ORJSONResponse(
+            await events.get_timeline_async(db, current_user.id, aquarium, days, limit)
+        )
+
+    position = _decode_cursor(cursor, limit)
+    # fetch one extra row to know if there is a next page
+    items = await events.get_timeline_async(
+        db,
+        current_user.id,
+        aquarium,
+        days,
+        limit=limit + 1 if limit is not None else None,
+        cursor=position,
+    )
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].timestamp, items[-1].id)
+    return ORJSONResponse(schemas.EventPage(items=items, next_cursor=next_cursor))
+
+
+@router.post("/bulk", response_model=list[schemas.Event])
+def create_dosings(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+    data: schemas.DosingBulkCreate,
+    db: Session = Depends(get_session),
+):
+    check_for_demo(current_user)
+    if len(data.dosings) > MAX_BULK_DOSINGS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_DOSINGS} dosings per request",
+        )
+    try:
+        return events.create_dosings(db, current_user.id, data.aquarium, data.dosings)
+    except ValueError as ex:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ex))
+
+
+@router.post("/waterchange", response_model=schemas.EventWaterChange)
+def create_water_change(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+    data: schemas.WaterChangeCreate,
+    db: Session = Depends(get_session),
+):
+    event_db = events.create_water_change(
+        db,
+        current_user.id,
+        data.aquarium,
+        data.unit_name,
+        data.quantity,
+        data.description,
+        data.timestamp,
+    )
+    return schemas.EventWaterChange.convert(event_db)
+
+
+@router.get("/waterchange/")
+def get_water_changes(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+    db: Session = Depends(get_session),
+    aquarium: str | None = None,
+    days: int | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    if cursor is None:
+        water_changes_db = events.get_water_changes(
+            db, current_user.id, aquarium, days=days, limit=limit
+        )
+        return ORJSONResponse(
+            list(map(lambda x: schemas.EventWaterChange.convert(x), water_changes_db))
+        )
+
+    position = _decode_cursor(cursor, limit)
+    # fetch one extra row to know if there is a next page
+    water_changes_db = events.get_water_changes(
+        db,
+        current_user.id,
+        aquarium,
+        days=days,
+        limit=limit + 1 if limit is not None else None,
+        cursor=position,
+    )
+    next_cursor = None
+    if limit is not None and len(water_changes_db) > limit:
+        water_changes_db = water_changes_db[:limit]
+        next_cursor = encode_cursor(
+            water_changes_db[-1].timestamp, water_changes_db[-1].id
+        )
+    return ORJSONResponse(
+        schemas.EventWaterChangePage(
+            items=list(map(schemas.EventWaterChange.convert, water_changes_db)),
+            next_cursor=next_cursor,
+        )
+    )
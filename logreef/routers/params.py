@@ -1,11 +1,19 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 
-from logreef import schemas
-from logreef.persistence.database import get_session, Session
-from logreef.user import get_current_user, check_for_demo
-from logreef.persistence import params
+from logreef import schemas, series
+from logreef.persistence.database import (
+    get_session,
+    get_async_session,
+    Session,
+    AsyncSession,
+)
+from logreef.user import get_current_user, get_current_user_async, check_for_demo
+from logreef.persistence import params, aquariums
+from logreef.pagination import encode_cursor, decode_cursor
+from logreef.utils import gzip_chunks
 
 router = APIRouter()
 
@@ -30,28 +38,232 @@ def create_param(
     )
 
 
-@router.get("/")
-def get_params(
-    aquarium: str,
+MAX_BULK_ITEMS = 1000
+
+
+@router.post("/bulk")
+def create_params(
     current_user: Annotated[schemas.User, Depends(get_current_user)],
+    data: list[schemas.ParamCreate],
+    db: Session = Depends(get_session),
+):
+    check_for_demo(current_user)
+    if len(data) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_ITEMS} parameters per request",
+        )
+    created, errors = params.create_many(db, current_user.id, data)
+    return {"created": created, "errors": errors}
+
+
+PARAM_FORMATS = ("objects", "columnar")
+
+
+@router.get(
+    "/",
+    response_model=list[schemas.ParamInfo]
+    | schemas.ParamColumns
+    | schemas.ParamPage
+    | schemas.ParamColumnsPage,
+)
+async def get_params(
+    aquarium: str,
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
     type: str | None = None,
     days: int | None = None,
     limit: int | None = None,
     offset: int = 0,
-    db: Session = Depends(get_session),
+    cursor: str | None = None,
+    format: str = "objects",
+    db: AsyncSession = Depends(get_async_session),
 ):
-    return params.get_by_type(db, current_user.id, aquarium, type, days, limit, offset)
+    if format not in PARAM_FORMATS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"Format should be one of: {', '.join(PARAM_FORMATS)}",
+        )
+    # columnar: parallel arrays with display names and units once per type
+    get_by_type = (
+        params.get_by_type_columnar_async
+        if format == "columnar"
+        else params.get_by_type_async
+    )
+
+    if cursor is None:
+        items = await get_by_type(
+            db, current_user.id, aquarium, type, days, limit, offset
+        )
+        return schemas.ParamColumns(**items) if format == "columnar" else items
+
+    # cursor mode, an empty cursor requests the first page
+    if limit is not None and limit < 1:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="'limit' must be positive"
+        )
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as ex:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ex))
+
+    # fetch one extra row to know if there is a next page
+    items = await get_by_type(
+        db,
+        current_user.id,
+        aquarium,
+        type,
+        days,
+        limit=limit + 1 if limit is not None else None,
+        cursor=position,
+    )
+
+    if format == "columnar":
+        next_cursor = None
+        if limit is not None and len(items["ids"]) > limit:
+            items = params.truncate_param_columns(items, limit)
+            next_cursor = encode_cursor(items["timestamps"][-1], items["ids"][-1])
+        return schemas.ParamColumnsPage(**items, next_cursor=next_cursor)
+
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].timestamp, items[-1].id)
+    return schemas.ParamPage(items=items, next_cursor=next_cursor)
 
 
 @router.get("/count")
-def get_count(
+async def get_count(
     aquarium: str,
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
     type: str | None = None,
     days: int | None = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await params.get_count_by_type_async(
+        db, current_user.id, aquarium, type, days
+    )
+
+
+MAX_STATS_WINDOWS = 5
+MAX_STATS_DAYS = 3650
+
+
+@router.get("/stats", response_model=schemas.ParamStats)
+async def get_stats(
+    aquarium: str,
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    type: str | None = None,
+    days: Annotated[list[int] | None, Query()] = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """count, avg, std, min and max of each param type over the last 'days'
+    windows (7, 30 and 90 by default), e.g. ?days=7&days=365"""
+    windows = tuple(sorted(set(days))) if days else params.STATS_WINDOWS
+    if len(windows) > MAX_STATS_WINDOWS or not all(
+        0 <= n_days <= MAX_STATS_DAYS for n_days in windows
+    ):
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_STATS_WINDOWS} windows of 0 to {MAX_STATS_DAYS} days",
+        )
+    stats = await params.get_stats_by_windows_async(
+        db, current_user.id, aquarium, type, windows
+    )
+    return {"windows": windows, "stats": stats}
+
+
+MAX_SERIES_POINTS = 5000
+
+
+@router.get("/series", response_model=schemas.ParamSeries)
+async def get_series(
+    aquarium: str,
+    type: str,
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    bucket: str | None = None,
+    points: int | None = None,
+    days: int | None = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Chart data of one parameter type, either aggregated per calendar 'bucket'
+    (day, week or month) or downsampled to 'points' with LTTB"""
+    if (bucket is None) == (points is None):
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Either 'bucket' or 'points' should be given",
+        )
+    if bucket is not None:
+        if bucket not in params.SERIES_BUCKETS:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=f"Bucket should be one of: {', '.join(params.SERIES_BUCKETS)}",
+            )
+        data = await params.get_series_buckets_async(
+            db, current_user.id, aquarium, type, bucket, days
+        )
+    else:
+        if points < 3 or points > MAX_SERIES_POINTS:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=f"'points' should be between 3 and {MAX_SERIES_POINTS}",
+            )
+        data = await series.get_downsampled_async(
+            db, current_user.id, aquarium, type, points, days
+        )
+    return {"param_type_name": type, "bucket": bucket, "points": data}
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+@router.get("/export")
+def export_params(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+    aquarium: str | None = None,
+    type: str | None = None,
+    format: str = "csv",
+    gzip: bool = False,
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"Format should be one of: {', '.join(EXPORT_MEDIA_TYPES)}",
+        )
+    content = params.stream_export(current_user.id, aquarium, type, format)
+    headers = {"Content-Disposition": f'attachment; filename="params.{format}"'}
+    if gzip:
+        content = gzip_chunks(content)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        content, media_type=EXPORT_MEDIA_TYPES[format], headers=headers
+    )
+
+
+@router.post("/import")
+def import_params(
+    current_user: Annotated[schemas.User, Depends(get_current_user)],
+    aquarium: str,
+    file: UploadFile,
+    convert: bool = True,
     db: Session = Depends(get_session),
 ):
-    return params.get_count_by_type(db, current_user.id, aquarium, type, days)
+    check_for_demo(current_user)
+    aquarium_db = aquariums.get_by_name(db, current_user.id, aquarium)
+    if aquarium_db is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail=f"Aquarium '{aquarium}' not found"
+        )
+    try:
+        imported, errors, n_errors = params.import_csv(
+            db, current_user.id, aquarium_db.id, file.file, convert_value=convert
+        )
+    except (ValueError, UnicodeDecodeError) as ex:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ex))
+    return {
+        "imported": imported,
+        "n_errors": n_errors,
+        "errors": errors,
+    }
 
 
 @router.delete("/{param_id}")
@@ -75,12 +287,12 @@ def delete_param_by_id(
 
 
 @router.get("/{param_id}")
-def get_param_by_id(
+async def get_param_by_id(
     param_id: int,
-    current_user: Annotated[schemas.User, Depends(get_current_user)],
-    db: Session = Depends(get_session),
+    current_user: Annotated[schemas.User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_session),
 ):
-    return params.get_param_by_id(db, current_user.id, param_id)
+    return await params.get_param_by_id_async(db, current_user.id, param_id)
 
 
 @router.put("/{param_id}")
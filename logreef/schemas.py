@@ -96,6 +96,74 @@ class ParamInfo(BaseModel):
         ]
 
 
+class ParamPage(BaseModel):
+    items: list[ParamInfo]
+    next_cursor: str | None = None
+
+
+class ParamTypeColumnInfo(BaseModel):
+    display_name: str
+    unit: str
+
+
+class TestKitColumnInfo(BaseModel):
+    display_name: str
+
+
+class ParamColumns(BaseModel):
+    """ParamInfo rows as parallel arrays, see params.get_by_type_columnar"""
+
+    ids: list[int]
+    param_type_names: list[str]
+    test_kit_names: list[str]
+    values: list[float]
+    timestamps: list[datetime]
+    notes: list[str | None]
+    created_on: list[datetime]
+    updated_on: list[datetime]
+    param_types: dict[str, ParamTypeColumnInfo]
+    test_kits: dict[str, TestKitColumnInfo]
+
+
+class ParamColumnsPage(ParamColumns):
+    next_cursor: str | None = None
+
+
+class WindowStats(BaseModel):
+    count: int
+    avg: float | None
+    std: float | None
+    min: float | None
+    max: float | None
+
+
+class ParamStats(BaseModel):
+    windows: list[int]
+    # by param type then window in days
+    stats: dict[str, dict[int, WindowStats]]
+
+
+class SeriesBucket(BaseModel):
+    timestamp: datetime
+    min: float
+    max: float
+    avg: float
+    last: float
+    count: int
+
+
+class SeriesPoint(BaseModel):
+    id: int
+    timestamp: datetime
+    value: float
+
+
+class ParamSeries(BaseModel):
+    param_type_name: str
+    bucket: str | None
+    points: list[SeriesBucket] | list[SeriesPoint]
+
+
 class ParamUpdate(BaseModel):
     value: float | None = None
     note: str | None = None
@@ -123,6 +191,26 @@ class Unit(BaseModel):
     display_name: str
 
 
+class Additive(BaseModel):
+    name: str
+    display_name: str
+
+
+class ParamType(BaseModel):
+    name: str
+    unit: str
+    display_name: str | None
+
+
+class TestKit(BaseModel):
+    name: str
+    param_type_name: str
+    display_name: str
+    display_unit: str
+    description: str | None
+    is_default: bool
+
+
 class WaterChange(BaseModel):
     quantity: float | None
     description: str | None
@@ -152,6 +240,48 @@ class EventWaterChange(BaseModel):
         )
 
 
+class Dosing(BaseModel):
+    additive: Additive
+    quantity: float | None
+    description: str | None
+    unit: Unit | None
+
+
+class Misc(BaseModel):
+    description: str
+
+
+class Event(BaseModel):
+    id: int
+    type: str
+    aquarium_id: int
+    timestamp: datetime
+    detail: WaterChange | Dosing | Misc
+
+
+class EventPage(BaseModel):
+    items: list[Event]
+    next_cursor: str | None = None
+
+
+class DosingCreate(BaseModel):
+    additive_name: str
+    unit_name: str | None = None
+    quantity: float | None = None
+    description: str | None = None
+    timestamp: datetime | None = None
+
+
+class DosingBulkCreate(BaseModel):
+    aquarium: int | str
+    dosings: list[DosingCreate]
+
+
+class EventWaterChangePage(BaseModel):
+    items: list[EventWaterChange]
+    next_cursor: str | None = None
+
+
 class Token(BaseModel):
     username: str
     email: str
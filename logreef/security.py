@@ -1,28 +1,92 @@
 from typing import Any
 from datetime import datetime
 from datetime import timedelta, timezone
+import hashlib
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import requests
 from passlib.context import CryptContext
 from jose import jwt
 
 from logreef.config import get_config, ConfigAPI
+from logreef.cache import TTLCache
+from logreef.metrics import time_password, TOKEN_DECODE_DURATION
 
 SEND_EMAIL_URL = "https://thereeflog-function.azurewebsites.net/api/confirmation-email"
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is cpu bound, run it in a dedicated process pool so that login bursts
+# don't starve the server threads. 0 workers hashes in the calling thread.
+PASSWORD_POOL_WORKERS = int(get_config(ConfigAPI.PASSWORD_POOL_WORKERS, 2))
+PASSWORD_POOL_MAX_PENDING = int(
+    get_config(ConfigAPI.PASSWORD_POOL_MAX_PENDING, 4 * PASSWORD_POOL_WORKERS)
+)
+
+_password_pool: ProcessPoolExecutor | None = None
+_password_pool_lock = threading.Lock()
+_password_slots = threading.BoundedSemaphore(max(PASSWORD_POOL_MAX_PENDING, 1))
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+# verified payloads by token hash, kept at most until the token 'exp' claim
+token_cache = TTLCache(
+    max_size=int(get_config(ConfigAPI.TOKEN_CACHE_MAX_SIZE, 10000)),
+    ttl=float(get_config(ConfigAPI.TOKEN_CACHE_TTL_SECONDS, 3600)),
+)
+
 def send_confirmation_email(token) -> tuple[str, bool]:
     payload = {"token": token}
     headers = {"Content-Type": "application/json"}
     response = requests.post(SEND_EMAIL_URL, json=payload, headers=headers)
     return response.text, response.ok
 
-def hash_password(password: str) -> str:
+def _hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_password(password: str, hash_password: str) -> bool:
+def _verify_password(password: str, hash_password: str) -> bool:
     return pwd_context.verify(password, hash_password)
 
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is None:
+            _password_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _password_pool
+
+def shutdown_password_pool():
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is not None:
+            _password_pool.shutdown(cancel_futures=True)
+            _password_pool = None
+
+def _run_in_password_pool(fn, *args):
+    if PASSWORD_POOL_WORKERS == 0:
+        return fn(*args)
+    # reject instead of queueing when too many hashes are already pending
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordPoolSaturated()
+    try:
+        return _get_password_pool().submit(fn, *args).result()
+    finally:
+        _password_slots.release()
+
+def hash_password(password: str) -> str:
+    with time_password("hash"):
+        return _run_in_password_pool(_hash_password, password)
+
+def verify_password(password: str, hash_password: str) -> bool:
+    with time_password("verify"):
+        return _run_in_password_pool(_verify_password, password, hash_password)
+
 def create_access_token(
     data: dict, expires_delta: timedelta | None = None
 ) -> tuple[str, datetime]:
@@ -52,15 +116,35 @@ def create_email_confirmation_token(email: str):
         algorithm=get_config(ConfigAPI.ALGORITHM),
     )
 
+def decode_token(
+    token: str, key: str, algorithms: list[str], options: dict | None = None
+) -> dict[str, Any]:
+    """Verify and decode 'token', repeated calls are served from 'token_cache'.
+
+    The returned payload is shared between callers and should not be modified.
+    """
+    start = time.perf_counter()
+    cache_key = (hashlib.sha256(token.encode()).digest(), key, tuple(algorithms))
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        TOKEN_DECODE_DURATION.labels("true").observe(time.perf_counter() - start)
+        return payload
+    payload = jwt.decode(token, key, algorithms=algorithms, options=options)
+    TOKEN_DECODE_DURATION.labels("false").observe(time.perf_counter() - start)
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp is not None else None
+    token_cache.set(cache_key, payload, ttl=ttl)
+    return payload
+
 def get_payload_from_token(token: str) -> dict[str, Any]:
-    return jwt.decode(
+    return decode_token(
         token,
         get_config(ConfigAPI.SECRET_KEY),
         algorithms=[get_config(ConfigAPI.ALGORITHM)],
     )
 
 def get_payload_from_supabase_token(token: str):
-    return jwt.decode(
+    return decode_token(
         token,
         get_config(ConfigAPI.SUPABASE_AUTH_SECRET),
         algorithms=["HS256"],
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import numpy as np
+
+from logreef.persistence import params
+from logreef.persistence.database import Session, AsyncSession
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the 'n_out' points kept by Largest-Triangle-Three-Buckets.
+
+    'x' must be sorted. First and last points are always kept, each bucket in
+    between keeps the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    if n_out < 3:
+        raise ValueError("At least 3 points are needed to downsample")
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets over the points between the first and the last one
+    edges = 1 + (np.arange(n_out - 1) * (n - 2)) // (n_out - 2)
+    edges = np.append(edges, n)
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # twice the triangle areas, enough to compare them
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+
+def get_downsampled(
+    db: Session,
+    user_id: int,
+    aquarium_name: str,
+    param_type: str,
+    n_points: int,
+    days: int | None = None,
+) -> list[dict[str, any]]:
+    ids, timestamps, values = params.get_series_values(
+        db, user_id, aquarium_name, param_type, days
+    )
+    return _downsample(ids, timestamps, values, n_points)
+
+
+async def get_downsampled_async(
+    db: AsyncSession,
+    user_id: int,
+    aquarium_name: str,
+    param_type: str,
+    n_points: int,
+    days: int | None = None,
+) -> list[dict[str, any]]:
+    ids, timestamps, values = await params.get_series_values_async(
+        db, user_id, aquarium_name, param_type, days
+    )
+    return _downsample(ids, timestamps, values, n_points)
+
+
+def _downsample(
+    ids: list[int], timestamps: list[datetime], values: list[float], n_points: int
+) -> list[dict[str, any]]:
+    if len(ids) == 0:
+        return []
+    x = np.array(timestamps, dtype="datetime64[us]").astype(np.int64)
+    kept = lttb(x, np.array(values), n_points)
+    return [
+        {"id": ids[i], "timestamp": timestamps[i], "value": values[i]} for i in kept
+    ]
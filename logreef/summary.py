@@ -1,19 +1,51 @@
 from datetime import datetime, timezone
+import math
 
 from logreef.persistence import params
-from logreef.persistence.database import Session
+from logreef.persistence.database import Session, AsyncSession
+
+# time-weighted stats windows, in days back from today's midnight (UTC)
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+WINDOWS = (WEEK_DAYS, MONTH_DAYS)
+
+
+def _cache_key(user_id: int, aquarium_name: str) -> tuple:
+    # the stats windows start at a date, summaries are only valid for a day
+    return (user_id, aquarium_name, datetime.now(timezone.utc).date())
 
 
 def get_for_all(
     db: Session, user_id: int, aquarium_name: str
 ) -> dict[str, dict[str, any]]:
-    # get all param types with at least one value
-    # get summaries per type
-    summary = {}
-    param_types = params.get_type_by_user(db, user_id, aquarium_name)
-    for param_type in param_types:
-        summary[param_type] = get_by_type(db, user_id, aquarium_name, param_type)
-    return summary
+    key = _cache_key(user_id, aquarium_name)
+    results = params.summary_cache.get(key)
+    if results is None:
+        generation = params.get_summary_generation(user_id)
+        # all param types with at least one value and their summaries in one query
+        results = params.get_summary_by_type(
+            db, user_id, aquarium_name, n_last=2, n_days=7, windows=WINDOWS
+        )
+        params.cache_summaries(key, results, generation)
+    return {
+        param_type: _build_summary(result) for param_type, result in results.items()
+    }
+
+
+async def get_for_all_async(
+    db: AsyncSession, user_id: int, aquarium_name: str
+) -> dict[str, dict[str, any]]:
+    key = _cache_key(user_id, aquarium_name)
+    results = params.summary_cache.get(key)
+    if results is None:
+        generation = params.get_summary_generation(user_id)
+        results = await params.get_summary_by_type_async(
+            db, user_id, aquarium_name, n_last=2, n_days=7, windows=WINDOWS
+        )
+        params.cache_summaries(key, results, generation)
+    return {
+        param_type: _build_summary(result) for param_type, result in results.items()
+    }
 
 
 def get_by_type(
@@ -22,39 +54,93 @@ def get_by_type(
     # last two values
     # time since last two values in seconds
     # # data points in last week
-    # # data points in last month
-    # TODO add temporal weighted averages for week and month
-    # keys: ["values", "timestamps", "time_since_secs", "n_last_week", "n_last_month"]
+    # time weighted averages and std for week and month
+    results = params.summary_cache.get(_cache_key(user_id, aquarium_name))
+    if results is None:
+        # only cached for all types, query this one alone
+        results = params.get_summary_by_type(
+            db,
+            user_id,
+            aquarium_name,
+            param_type=param_type,
+            n_last=2,
+            n_days=7,
+            windows=WINDOWS,
+        )
+    return _build_summary(results.get(param_type))
+
+
+async def get_by_type_async(
+    db: AsyncSession, user_id: int, aquarium_name: str, param_type: str
+) -> dict[str, any]:
+    results = params.summary_cache.get(_cache_key(user_id, aquarium_name))
+    if results is None:
+        results = await params.get_summary_by_type_async(
+            db,
+            user_id,
+            aquarium_name,
+            param_type=param_type,
+            n_last=2,
+            n_days=7,
+            windows=WINDOWS,
+        )
+    return _build_summary(results.get(param_type))
 
+
+def _build_summary(result: dict[str, any] | None) -> dict[str, any]:
     summary = {
         "values": [],
         "ids": [],
         "timestamps": [],
         "time_since_secs": [],
-        "count_last_week": None,
+        "count_last_week": 0,
         "avg_last_week": None,
         "std_last_week": None,
+        "time_avg_last_week": None,
+        "time_std_last_week": None,
+        "time_avg_last_month": None,
+        "time_std_last_month": None,
     }
 
-    # get last two info
-    last_params = params.get_by_type(db, user_id, aquarium_name, param_type, limit=2)
+    if result is None:
+        return summary
 
-    for param in last_params:
-        summary["values"].append(float(param.value))
-        summary["ids"].append(int(param.id))
-        summary["timestamps"].append(param.timestamp)
+    summary["values"] = result["values"]
+    summary["ids"] = result["ids"]
+    summary["timestamps"] = result["timestamps"]
 
+    # from the timestamps at read time, cached results stay correct
     now = datetime.now(timezone.utc).replace(tzinfo=None)
     for ts in summary["timestamps"]:
         summary["time_since_secs"].append((now - ts).total_seconds())
 
-    # get last week count
-    results = params.get_stats_by_type_last_n_days(
-        db, user_id, aquarium_name, param_type, 7
-    )
+    summary["count_last_week"] = result["count"]
+    summary["avg_last_week"] = result["avg"]
+    summary["std_last_week"] = result["std"]
 
-    summary["count_last_week"] = results["count"]
-    summary["avg_last_week"] = results["avg"]
-    summary["std_last_week"] = results["std"]
+    # at read time too, the last reading counts until now
+    now_secs = now.replace(tzinfo=timezone.utc).timestamp()
+    last_secs = result["timestamps"][0].replace(tzinfo=timezone.utc).timestamp()
+    for name, days in [("week", WEEK_DAYS), ("month", MONTH_DAYS)]:
+        avg, std = _time_weighted_stats(
+            result["windows"][days], result["values"][0], last_secs, now_secs
+        )
+        summary[f"time_avg_last_{name}"] = avg
+        summary[f"time_std_last_{name}"] = std
 
     return summary
+
+
+def _time_weighted_stats(
+    window: dict[str, float], last_value: float, last_secs: float, now_secs: float
+) -> tuple[float | None, float | None]:
+    """Mean and (population) std of the window, each reading weighs the time
+    it holds until the next one, or until now for the last one"""
+    # the window sums are of differences to the last value, its own interval
+    # only adds to the duration
+    duration = window["duration"] + max(now_secs - max(last_secs, window["start"]), 0)
+    if duration <= 0:
+        return None, None
+    mean_delta = window["weighted_sum"] / duration
+    variance = window["weighted_sum_squares"] / duration - mean_delta * mean_delta
+    return last_value + mean_delta, math.sqrt(max(variance, 0.0))
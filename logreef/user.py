@@ -3,9 +3,10 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from logreef.security import get_payload_from_token, get_payload_from_supabase_token
-from logreef.persistence.database import get_session
+from logreef.persistence.database import get_session, get_async_session
 from logreef.persistence import users, aquariums, models
 
 from logreef import schemas
@@ -22,14 +23,40 @@ def check_for_demo(user: schemas.User):
     return False
 
 def get_current_user(
-    req: Request, token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_session)
+    req: Request,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Session = Depends(get_session),
 ):
-    oauth2 = True if "oauth2" in req.headers else False
-    credentials_exception = HTTPException(
+    """For sync routes, the user is read with the same session as the route"""
+    # should not happen that a non verified user gets a token, but checking anyway
+    user = users.get_verified_by_email(db, email=_get_email(req, token))
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
+async def get_current_user_async(
+    req: Request,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: AsyncSession = Depends(get_async_session),
+):
+    # should not happen that a non verified user gets a token, but checking anyway
+    user = await users.get_verified_by_email_async(db, email=_get_email(req, token))
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _get_email(req: Request, token: str) -> str:
+    oauth2 = True if "oauth2" in req.headers else False
     try:
         email = None
         if not oauth2:
@@ -38,16 +65,11 @@ def get_current_user(
         else:
             payload = get_payload_from_supabase_token(token)
             email = payload["user_metadata"]["email"]
-        if email is None:
-            raise credentials_exception
     except:
-        raise credentials_exception
-    user = users.get_by_email(db, email=email)
-    if (
-        user is None or not user.verified
-    ):  # should not happen that a non verified user gets a token, but adding anyway
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    if email is None:
+        raise _credentials_exception()
+    return email
 
 
 def get_me(db: Session, user: int | models.User) -> schemas.Me:
@@ -55,7 +77,17 @@ def get_me(db: Session, user: int | models.User) -> schemas.Me:
         user = users.get_by_id(db, user)
 
     user_aquariums = aquariums.get_all(db, user.id)
+    return _build_me(user, user_aquariums)
+
+
+async def get_me_async(db: AsyncSession, user: schemas.User) -> schemas.Me:
+    user_aquariums = await aquariums.get_all_async(db, user.id)
+    return _build_me(user, user_aquariums)
+
 
+def _build_me(
+    user: models.User | schemas.User, user_aquariums: list[models.Aquarium]
+) -> schemas.Me:
     all_aquariums = []
     for user_aquarium in user_aquariums:
         all_aquariums.append(
@@ -1,6 +1,12 @@
 import pytest
 
-from logreef.persistence.database import SessionLocal
+from logreef.persistence.database import SessionLocal, engine
+from logreef.persistence import migrations
+
+
+@pytest.fixture(scope="session", autouse=True)
+def apply_migrations():
+    migrations.apply(engine)
 
 
 @pytest.fixture()
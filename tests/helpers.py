@@ -1,9 +1,13 @@
+import asyncio
 import string
 import random
+from contextlib import contextmanager
 
+from sqlalchemy import event, Engine
 from logreef.persistence import users, models, aquariums
-from logreef.persistence.database import Session
+from logreef.persistence.database import Session, AsyncSessionLocal, async_engine
 from logreef.config import get_config, ConfigAPI
+from logreef.security import create_access_token
 
 
 def get_user(db: Session) -> models.User:
@@ -19,12 +23,14 @@ def get_random_string(length: int):
     )
 
 
-def save_random_user(db: Session, is_demo=False) -> models.User:
+def save_random_user(db: Session, is_demo=False, verified=False) -> models.User:
     username = get_random_string(10)
     password = get_random_string(10)
     email = get_random_string(5) + "@" + get_random_string(3) + ".com"
     # create new test user
-    user = users.create(db, username, password, email=email, is_demo=is_demo)
+    user = users.create(
+        db, username, password, email=email, is_demo=is_demo, verified=verified
+    )
     return user
 
 
@@ -34,8 +40,42 @@ def save_random_aquarium(db: Session, user_id: int) -> models.Aquarium:
 
 
 def save_random_user_and_aquarium(
-    db: Session, is_demo: bool = False
+    db: Session, is_demo: bool = False, verified: bool = False
 ) -> tuple[models.User, models.Aquarium]:
-    user = save_random_user(db, is_demo=is_demo)
+    user = save_random_user(db, is_demo=is_demo, verified=verified)
     aquarium = save_random_aquarium(db, user.id)
     return user, aquarium
+
+
+def get_auth_headers(user: models.User) -> dict[str, str]:
+    token, _ = create_access_token({"username": user.username, "email": user.email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def capture_statements(engine: Engine):
+    """Record (statement, parameters) of every query sent to the db"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def run_async(fn, *args, **kwargs):
+    """Run the coroutine function 'fn(db, *args, **kwargs)' with an async session"""
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await fn(db, *args, **kwargs)
+        finally:
+            # pooled connections are bound to the event loop of this run
+            await async_engine.dispose()
+
+    return asyncio.run(run())
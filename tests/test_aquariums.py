@@ -1,8 +1,12 @@
-from .helpers import get_random_string, save_random_user_and_aquarium
+from .helpers import (
+    get_random_string,
+    save_random_user_and_aquarium,
+    capture_statements,
+)
 
 from logreef.persistence import users
 from logreef.persistence import aquariums
-from logreef.persistence.database import delete_from_db
+from logreef.persistence.database import delete_from_db, engine
 
 
 def test_get_by_username(test_db):
@@ -68,3 +72,19 @@ def test_can_update_aquarium(test_db):
     assert aquarium_updated.updated_on > aquarium.created_on
 
     delete_from_db(test_db, user)
+
+
+def test_create_aquarium_and_user_round_trips(test_db):
+    with capture_statements(engine) as statements:
+        user = users.create(test_db, get_random_string(10), email="a@b.com")
+        assert user.id is not None
+        assert user.verified is False
+    assert len(statements) == 1
+
+    with capture_statements(engine) as statements:
+        aquarium = aquariums.create(test_db, user.id, get_random_string(10))
+        assert aquarium.user_id == user.id
+        assert aquarium.created_on.tzinfo is None
+    assert len(statements) == 1
+
+    delete_from_db(test_db, user)
@@ -0,0 +1,56 @@
+import time
+
+from logreef.cache import TTLCache
+from logreef.persistence import users
+from logreef.persistence.database import delete_from_db, engine
+from .helpers import save_random_user, capture_statements
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_entries_expire():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1, ttl=0.05)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_cache_pop_where():
+    cache = TTLCache(max_size=10, ttl=60)
+    for i in range(5):
+        cache.set(i, i)
+    assert cache.pop_where(lambda key, value: value % 2 == 0) == 3
+    assert cache.stats()["size"] == 2
+
+
+def test_verified_user_is_cached_until_updated(test_db):
+    user = save_random_user(test_db)
+    assert users.get_verified_by_email(test_db, user.email) is None
+
+    users.set_to_verified(test_db, user.email)
+    cached = users.get_verified_by_email(test_db, user.email)
+    assert cached.id == user.id
+
+    with capture_statements(engine) as statements:
+        assert users.get_verified_by_email(test_db, user.email) is cached
+    assert len(statements) == 0
+
+    users.update_password(test_db, user.id, "new_password")
+    assert users.get_verified_by_email(test_db, user.email) is not cached
+
+    delete_from_db(test_db, user)
@@ -0,0 +1,62 @@
+from starlette.requests import Request
+
+from logreef.config import ParamTypes, TestKits
+from logreef.persistence import catalog, params
+from logreef.persistence.database import delete_from_db, engine
+from logreef.responses import etag_matches
+from .helpers import save_random_user_and_aquarium, capture_statements
+
+
+def test_catalog_holds_reference_tables(test_db):
+    current = catalog.load(test_db)
+    assert catalog.get_catalog() is current
+
+    assert set(current.param_types) == {param_type.value for param_type in ParamTypes}
+    assert set(current.test_kits) == {test_kit.value for test_kit in TestKits}
+    assert "L" in current.units
+    assert "kalkwasser" in current.additives
+
+    alkalinity_kits = current.get_test_kits_by_type("alkalinity")
+    assert {test_kit.name for test_kit in alkalinity_kits} == {
+        "generic_dkh",
+        "salifert_alkalinity",
+    }
+
+    # version only depends on the content
+    assert catalog.load(test_db).version == current.version
+
+
+def test_param_reads_do_not_join_reference_tables(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    param = params.create(
+        test_db, user.id, aquarium.id, ParamTypes.ALKALINITY, 8.5, test_kit="generic_dkh"
+    )
+    catalog.get_catalog()
+
+    with capture_statements(engine) as statements:
+        items = params.get_by_type(test_db, user.id, aquarium.name)
+        by_id = params.get_param_by_id(test_db, user.id, param.id)
+    for statement, _ in statements:
+        assert "param_types" not in statement
+        assert "test_kits" not in statement
+
+    assert items[0] == by_id
+    assert by_id.param_type_display_name == "Alkalinity"
+    assert by_id.test_kit_display_name == "Default dKH"
+    assert by_id.unit == "dkh"
+
+    delete_from_db(test_db, user)
+
+
+def test_etag_matches():
+    def request(if_none_match: str | None) -> Request:
+        headers = []
+        if if_none_match is not None:
+            headers.append((b"if-none-match", if_none_match.encode()))
+        return Request({"type": "http", "headers": headers})
+
+    assert not etag_matches(request(None), '"abc"')
+    assert etag_matches(request('"abc"'), '"abc"')
+    assert etag_matches(request('"xyz", W/"abc"'), '"abc"')
+    assert etag_matches(request("*"), '"abc"')
+    assert not etag_matches(request('"xyz"'), '"abc"')
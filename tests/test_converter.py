@@ -0,0 +1,14 @@
+import pytest
+
+from logreef.config import ParamTypes, TestKits, get_param_type, get_test_kit
+
+
+def test_enum_lookups():
+    for param_type in ParamTypes:
+        assert get_param_type(param_type.value) is param_type
+    for test_kit in TestKits:
+        assert get_test_kit(test_kit.value) is test_kit
+    with pytest.raises(Exception):
+        get_param_type("salinity")
+    with pytest.raises(Exception):
+        get_test_kit("PH")
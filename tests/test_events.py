@@ -1,7 +1,14 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
 from .helpers import get_random_string, save_random_user_and_aquarium
 
-from logreef.persistence import events
-from logreef.persistence.database import delete_from_db
+from logreef import schemas
+from logreef.persistence import events, aquariums
+from logreef.persistence.database import delete_from_db, engine
+from .helpers import capture_statements
 
 
 def test_can_create_new_water_change(test_db):
@@ -35,3 +42,163 @@ def test_can_create_new_water_change(test_db):
         test_db, event.water_change
     )  # not sure why cascade not working from user
     delete_from_db(test_db, user)
+
+
+def test_create_water_change_round_trips(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    with capture_statements(engine) as statements:
+        event = events.create_water_change(test_db, user.id, aquarium.id, "L", 20)
+        assert event.water_change.quantity == 20
+        assert event.timestamp.tzinfo is None
+    assert [statement.split()[0] for statement, _ in statements] == [
+        "INSERT",
+        "INSERT",
+    ]
+
+    delete_from_db(test_db, event.water_change)
+    delete_from_db(test_db, user)
+
+
+def test_water_changes_are_listed_with_one_query(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    other = aquariums.create(test_db, user.id, get_random_string(8))
+    created = []
+    for i in range(6):
+        created.append(
+            events.create_water_change(
+                test_db,
+                user.id,
+                aquarium.id if i % 3 else other.id,
+                "L",
+                i,
+                timestamp=datetime(2024, 1, 1 + i),
+            )
+        )
+    test_db.expunge_all()
+
+    for aquarium_filter, expected in [(None, 6), (aquarium.name, 4), (other.id, 2)]:
+        with capture_statements(engine) as statements:
+            items = events.get_water_changes(test_db, user.id, aquarium_filter)
+            converted = [schemas.EventWaterChange.convert(item) for item in items]
+        assert len(statements) == 1
+        assert len(converted) == expected
+        assert converted[0].detail.unit.name == "L"
+        test_db.expunge_all()
+
+    # pages by (timestamp, id), most recent first
+    first = events.get_water_changes(test_db, user.id, limit=4)
+    assert [item.id for item in first] == [event.id for event in created[::-1][:4]]
+    last = first[-1]
+    second = events.get_water_changes(
+        test_db, user.id, limit=4, cursor=(last.timestamp, last.id)
+    )
+    assert [item.id for item in second] == [event.id for event in created[::-1][4:]]
+
+    for event in events.get_water_changes(test_db, user.id):
+        delete_from_db(test_db, event.water_change)
+    delete_from_db(test_db, user)
+
+
+def test_timeline_merges_event_types(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    water_change = events.create_water_change(
+        test_db, user.id, aquarium.id, "L", 20, timestamp=datetime(2024, 1, 1)
+    )
+    dosings = events.create_dosings(
+        test_db,
+        user.id,
+        aquarium.name,
+        [
+            schemas.DosingCreate(
+                additive_name="kalkwasser",
+                unit_name="mL",
+                quantity=i,
+                timestamp=datetime(2024, 1, 2 + i),
+            )
+            for i in range(3)
+        ],
+    )
+    misc_id = test_db.scalar(
+        text("INSERT INTO event_miscs (description) VALUES ('new pump') RETURNING id")
+    )
+    test_db.execute(
+        text(
+            "INSERT INTO events (user_id, aquarium_id, misc_id, timestamp) "
+            "VALUES (:user_id, :aquarium_id, :misc_id, '2024-01-10')"
+        ),
+        {"user_id": user.id, "aquarium_id": aquarium.id, "misc_id": misc_id},
+    )
+    test_db.commit()
+
+    with capture_statements(engine) as statements:
+        timeline = events.get_timeline(test_db, user.id, aquarium.name)
+    assert len(statements) == 1
+    assert [event.type for event in timeline] == [
+        "misc",
+        "dosing",
+        "dosing",
+        "dosing",
+        "water_change",
+    ]
+    assert timeline[0].detail.description == "new pump"
+    assert timeline[1].detail.additive.name == "kalkwasser"
+    assert timeline[1].detail.unit.name == "mL"
+    assert timeline[1:4] == dosings[::-1]
+    assert timeline[4].id == water_change.id
+
+    last = timeline[1]
+    page = events.get_timeline(
+        test_db, user.id, aquarium.name, limit=2, cursor=(last.timestamp, last.id)
+    )
+    assert [event.id for event in page] == [event.id for event in timeline[2:4]]
+
+    dosing_ids = test_db.scalars(
+        text("SELECT dosing_id FROM events WHERE id = ANY(:ids)"),
+        {"ids": [event.id for event in dosings]},
+    ).all()
+    delete_from_db(test_db, water_change.water_change)
+    delete_from_db(test_db, user)
+    test_db.execute(text("DELETE FROM event_miscs WHERE id = :id"), {"id": misc_id})
+    test_db.execute(
+        text("DELETE FROM event_dosings WHERE id = ANY(:ids)"), {"ids": dosing_ids}
+    )
+    test_db.commit()
+
+
+def test_create_dosings_in_two_statements(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    with pytest.raises(ValueError):
+        events.create_dosings(
+            test_db,
+            user.id,
+            aquarium.id,
+            [schemas.DosingCreate(additive_name="vodka", unit_name="mL")],
+        )
+    with pytest.raises(ValueError):
+        events.create_dosings(test_db, user.id, aquarium.id + 1000000, [])
+
+    with capture_statements(engine) as statements:
+        created = events.create_dosings(
+            test_db,
+            user.id,
+            aquarium.id,
+            [
+                schemas.DosingCreate(additive_name="kalkwasser", quantity=i)
+                for i in range(50)
+            ],
+        )
+    inserts = [
+        statement for statement, _ in statements if statement.startswith("INSERT")
+    ]
+    assert len(inserts) == 2
+    assert [event.detail.quantity for event in created] == list(range(50))
+
+    dosing_ids = test_db.scalars(
+        text("SELECT dosing_id FROM events WHERE user_id = :user_id ORDER BY id"),
+        {"user_id": user.id},
+    ).all()
+    delete_from_db(test_db, user)
+    test_db.execute(
+        text("DELETE FROM event_dosings WHERE id = ANY(:ids)"), {"ids": dosing_ids}
+    )
+    test_db.commit()
@@ -0,0 +1,84 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from logreef import instrumentation
+from logreef.instrumentation import QueryStats, QueryStatsMiddleware, track_queries
+from logreef.persistence import params
+from logreef.persistence.catalog import get_catalog
+from logreef.persistence.database import SessionLocal, delete_from_db
+from .helpers import run_async, save_random_user_and_aquarium
+
+
+def test_track_queries_sync_and_async(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    # loaded on first use, not counted when the test runs alone
+    get_catalog()
+
+    with track_queries() as stats:
+        params.get_by_type(test_db, user.id, aquarium.name)
+        params.get_count_by_type(test_db, user.id, aquarium.name)
+    assert stats.count == 2
+    assert stats.total_secs > 0
+    assert len(stats.slowest) == 2
+
+    # not tracked outside of the context
+    params.get_by_type(test_db, user.id, aquarium.name)
+    assert stats.count == 2
+
+    with track_queries() as stats:
+        run_async(params.get_by_type_async, user.id, aquarium.name)
+    assert stats.count >= 1
+
+    delete_from_db(test_db, user)
+
+
+def test_slowest_keeps_longest_statements():
+    stats = QueryStats()
+    for i, secs in enumerate([0.1, 0.5, 0.2, 0.4, 0.3]):
+        stats.record(f"q{i}", secs)
+    assert stats.count == 5
+    assert [statement for _, statement in stats.slowest] == ["q1", "q3", "q4"]
+    assert stats.server_timing() == (
+        'db;dur=1500.00;desc="5 queries", db-slowest;dur=500.00'
+    )
+
+
+def test_slow_queries_are_logged(test_db, monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger=instrumentation.__name__):
+        test_db.execute(text("SELECT 1"))
+    assert any("Slow query" in record.message for record in caplog.records)
+
+
+def test_failed_statements_raise_the_database_error(test_db):
+    with track_queries() as stats:
+        with pytest.raises(ProgrammingError):
+            test_db.execute(text("SELECT * FROM no_such_table"))
+        test_db.rollback()
+        test_db.execute(text("SELECT 1"))
+    assert stats.count == 1
+    assert test_db.connection().info.get("query_start") == []
+
+
+def test_server_timing_header():
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/")
+    def root():
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        finally:
+            db.close()
+        return {}
+
+    response = TestClient(app).get("/")
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from logreef import metrics
+from logreef.main import app as logreef_app
+from logreef.persistence.database import engine
+from logreef.security import create_access_token, get_payload_from_token
+
+
+def get_sample(name: str, labels: dict) -> float:
+    return metrics.registry.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    router = APIRouter()
+
+    @router.get("/{item_id}")
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/items")
+    app.add_middleware(metrics.MetricsMiddleware)
+    client = TestClient(app)
+
+    labels = {"method": "GET", "route": "/items/{item_id}"}
+    before = get_sample("logreef_request_duration_seconds_count", labels)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/abc")
+    client.get("/unknown")
+
+    assert get_sample("logreef_request_duration_seconds_count", labels) == before + 3
+    assert get_sample("logreef_responses_total", {**labels, "status": "422"}) >= 1
+    assert get_sample("logreef_responses_total", {**labels, "status": "200"}) >= 2
+    assert (
+        get_sample(
+            "logreef_responses_total",
+            {"method": "GET", "route": metrics.UNMATCHED_ROUTE, "status": "404"},
+        )
+        >= 1
+    )
+
+
+def test_pool_collector():
+    collector = metrics.PoolCollector({"sync": engine})
+    with engine.connect():
+        samples = {
+            sample.name: sample.value
+            for family in collector.collect()
+            for sample in family.samples
+        }
+    assert samples["logreef_db_pool_checked_out"] >= 1
+    assert samples["logreef_db_pool_checkouts_total"] >= 1
+    assert "logreef_db_pool_size" in samples
+
+
+def test_token_decode_timing():
+    token, _ = create_access_token({"username": "test", "email": "test@test.com"})
+    misses = get_sample("logreef_token_decode_duration_seconds_count", {"cached": "false"})
+    hits = get_sample("logreef_token_decode_duration_seconds_count", {"cached": "true"})
+    get_payload_from_token(token)
+    get_payload_from_token(token)
+    assert (
+        get_sample("logreef_token_decode_duration_seconds_count", {"cached": "false"})
+        == misses + 1
+    )
+    assert (
+        get_sample("logreef_token_decode_duration_seconds_count", {"cached": "true"})
+        == hits + 1
+    )
+
+
+def test_metrics_need_the_scraper_token(monkeypatch):
+    client = TestClient(logreef_app)
+
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    assert client.get("/metrics").status_code == 401
+    assert (
+        client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 401
+    )
+
+    monkeypatch.setenv("METRICS_TOKEN", "scraper-token")
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scraper-token"})
+    assert response.status_code == 200
+    assert b"logreef_request_duration_seconds" in response.content
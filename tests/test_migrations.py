@@ -0,0 +1,171 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from logreef.persistence import migrations, params
+from logreef.persistence.catalog import get_catalog
+from logreef.persistence.database import engine, SessionLocal
+from logreef.config import ParamTypes
+from .helpers import capture_statements
+
+# enough rows per user for index scans to win once analyzed, set
+# EXPLAIN_TEST_ROWS (e.g. 2000000) to check the plans at production size
+N_ROWS = int(os.environ.get("EXPLAIN_TEST_ROWS", 100_000))
+N_USERS = 1000
+
+
+def test_all_migrations_are_applied():
+    applied = migrations.get_applied(engine)
+    for version, name, _ in migrations.get_migrations():
+        assert applied.get(version) == name
+
+
+def test_apply_is_idempotent():
+    assert migrations.apply(engine) == []
+
+
+@pytest.fixture(scope="module")
+def large_db():
+    # loaded on first use, its statements would be captured by the tests
+    get_catalog()
+    # everything is seeded in one transaction which is rolled back at the end
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(
+                """
+                INSERT INTO users (username, email, verified)
+                SELECT 'explain-' || i, 'explain-' || i || '@explain.com', TRUE
+                FROM generate_series(1, :n_users) AS i
+                """
+            ),
+            {"n_users": N_USERS},
+        )
+        db.execute(
+            text(
+                """
+                INSERT INTO aquariums (user_id, name)
+                SELECT id, 'Default' FROM users WHERE email LIKE '%@explain.com'
+                """
+            )
+        )
+        db.execute(
+            text(
+                """
+                WITH a AS (
+                    SELECT ROW_NUMBER() OVER () AS n, aquariums.id, aquariums.user_id
+                    FROM aquariums JOIN users ON aquariums.user_id = users.id
+                    WHERE users.email LIKE '%@explain.com'
+                ),
+                t AS (
+                    SELECT ROW_NUMBER() OVER () AS n, name, param_type_name
+                    FROM test_kits WHERE is_default
+                )
+                INSERT INTO param_values (user_id, aquarium_id, param_type_name, test_kit_name, value, timestamp)
+                SELECT a.user_id, a.id, t.param_type_name, t.name, random() * 10,
+                    NOW() - (i || ' minutes')::INTERVAL
+                FROM generate_series(1, :n_rows) AS i
+                JOIN a ON a.n = i % :n_users + 1
+                JOIN t ON t.n = i % 6 + 1
+                """
+            ),
+            {"n_rows": N_ROWS, "n_users": N_USERS},
+        )
+        db.execute(text("ANALYZE users, aquariums, param_values, param_daily_stats"))
+        user_id = db.execute(
+            text("SELECT id FROM users WHERE email = 'explain-1@explain.com'")
+        ).scalar()
+        yield db, user_id
+    finally:
+        db.rollback()
+        db.close()
+
+
+def get_plan_nodes(db, statement: str, parameters: dict) -> list[dict]:
+    cursor = db.connection().connection.cursor()
+    cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes = []
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        lambda db, user_id: params.get_by_type(
+            db, user_id, "Default", ParamTypes.ALKALINITY, limit=50
+        ),
+        lambda db, user_id: params.get_count_by_type(
+            db, user_id, "Default", ParamTypes.ALKALINITY
+        ),
+        lambda db, user_id: params.get_summary_by_type(db, user_id, "Default"),
+        lambda db, user_id: params.get_type_by_user(db, user_id, "Default"),
+    ],
+)
+def test_hot_queries_use_index_scans(large_db, query):
+    db, user_id = large_db
+
+    with capture_statements(engine) as statements:
+        query(db, user_id)
+    assert len(statements) == 1
+
+    nodes = get_plan_nodes(db, *statements[0])
+    param_values_scans = [
+        node for node in nodes if node.get("Relation Name") == "param_values"
+    ]
+    assert len(param_values_scans) == 1
+    assert param_values_scans[0]["Node Type"] != "Seq Scan"
+    # bitmap heap scans reference the index in their child node
+    index_names = {node.get("Index Name") for node in nodes}
+    assert "param_values_user_aquarium_type_timestamp_idx" in index_names
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        lambda db, user_id: params.get_stats_by_type_last_n_days(
+            db, user_id, "Default", ParamTypes.ALKALINITY.value, 30
+        ),
+        lambda db, user_id: params.get_stats_by_windows(db, user_id, "Default"),
+    ],
+)
+def test_window_stats_read_the_daily_rollup(large_db, query):
+    db, user_id = large_db
+
+    with capture_statements(engine) as statements:
+        query(db, user_id)
+    assert len(statements) == 1
+
+    nodes = get_plan_nodes(db, *statements[0])
+    relations = {node.get("Relation Name") for node in nodes}
+    assert "param_values" not in relations
+    rollup_scans = [
+        node for node in nodes if node.get("Relation Name") == "param_daily_stats"
+    ]
+    assert len(rollup_scans) == 1
+    assert rollup_scans[0]["Node Type"] != "Seq Scan"
+
+
+@pytest.mark.parametrize("cursor", [None, (datetime.now(timezone.utc), 2**31 - 1)])
+def test_cursor_pages_over_all_types_use_the_timestamp_index(large_db, cursor):
+    db, user_id = large_db
+
+    with capture_statements(engine) as statements:
+        params.get_by_type(db, user_id, "Default", limit=50, cursor=cursor)
+    assert len(statements) == 1
+
+    nodes = get_plan_nodes(db, *statements[0])
+    assert "Sort" not in {node["Node Type"] for node in nodes}
+    index_names = {node.get("Index Name") for node in nodes}
+    assert "param_values_user_aquarium_timestamp_id_idx" in index_names
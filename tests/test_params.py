@@ -1,18 +1,40 @@
 from datetime import datetime
 from datetime import UTC
 from datetime import timedelta
+import csv
+import gzip
+import io
+import json
 import pytest
 import math
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
 
 from logreef.persistence import params
-from logreef.persistence.database import delete_from_db
-from logreef.config import TestKits, ParamTypes
+from logreef.persistence.database import (
+    SessionLocal,
+    async_engine,
+    delete_from_db,
+    engine,
+)
+from logreef import schemas
+from logreef.utils import gzip_chunks
+from logreef.config import TestKits, ParamTypes, default_test_kits
 from logreef.persistence import users
+from logreef.persistence.catalog import get_catalog
+from logreef.pagination import encode_cursor, decode_cursor
+from logreef.main import app
+from logreef.responses import dumps
 
 from .helpers import (
     save_random_user,
     save_random_aquarium,
     save_random_user_and_aquarium,
+    capture_statements,
+    run_async,
+    get_auth_headers,
 )
 
 
@@ -90,6 +112,26 @@ def test_can_get_param_type(test_db):
     param_type = params.get_type(test_db, param_type_name)
     assert param_type
     assert param_type.name == param_type_name
+    assert params.get_type(test_db, " PH ") == param_type
+    assert params.get_type(test_db, "unknown") is None
+
+
+def test_can_create_with_catalog_entries(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    param_type = params.get_type(test_db, "alkalinity")
+    test_kit = get_catalog().test_kits["salifert_alkalinity"]
+
+    created = params.create(
+        test_db, user.id, aquarium.id, param_type, 0.5, test_kit=test_kit
+    )
+    assert created.param_type_name == "alkalinity"
+    assert created.test_kit_name == "salifert_alkalinity"
+    assert math.ceil(float(created.value) * 10) / 10 == 7.7
+
+    default = params.create(test_db, user.id, aquarium.id, param_type, 8.0)
+    assert default.test_kit_name == default_test_kits["alkalinity"].value
+
+    delete_from_db(test_db, user)
 
 
 def test_can_get_param_by_type(test_db):
@@ -329,3 +371,594 @@ def test_update_a_param_sets_a_new_updated_on(test_db):
 
     updated_param = params.update_by_id(test_db, user.id, param.id, param.value + 1)
     assert updated_param.updated_on > updated_param.created_on
+
+
+def test_can_paginate_params_with_cursor(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+
+    now_utc = datetime.now(UTC)
+    for i in range(10):
+        # pairs of readings with the same timestamp to check ties
+        params.create(
+            test_db,
+            user.id,
+            aquarium.id,
+            ParamTypes.ALKALINITY,
+            i,
+            now_utc - timedelta(days=i // 2),
+        )
+
+    expected = params.get_by_type(test_db, user.id, aquarium.name, ParamTypes.ALKALINITY)
+
+    pages = []
+    cursor = None
+    while True:
+        page = params.get_by_type(
+            test_db,
+            user.id,
+            aquarium.name,
+            ParamTypes.ALKALINITY,
+            limit=3,
+            cursor=cursor,
+        )
+        if not page:
+            break
+        pages.append(page)
+        cursor = decode_cursor(encode_cursor(page[-1].timestamp, page[-1].id))
+
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert [param.id for page in pages for param in page] == [
+        param.id for param in expected
+    ]
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+    delete_from_db(test_db, user)
+
+
+def test_can_create_many_params(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+
+    items = [
+        schemas.ParamCreate(aquarium=aquarium.name, param_type_name="ph", value=8.1),
+        schemas.ParamCreate(
+            aquarium=aquarium.name,
+            param_type_name="alkalinity",
+            test_kit_name="salifert_alkalinity",
+            value=0.5,
+        ),
+        schemas.ParamCreate(aquarium=aquarium.name, param_type_name="unknown", value=1),
+        schemas.ParamCreate(aquarium="unknown", param_type_name="ph", value=8.1),
+        schemas.ParamCreate(
+            aquarium=aquarium.id,
+            param_type_name="ph",
+            test_kit_name="hanna_nitrate",
+            value=8.1,
+        ),
+        schemas.ParamCreate(aquarium=aquarium.id, param_type_name="calcium", value=420),
+    ]
+
+    with capture_statements(engine) as statements:
+        created, errors = params.create_many(test_db, user.id, items)
+
+    inserts = [s for s, _ in statements if s.lstrip().startswith("INSERT")]
+    assert len(inserts) == 1
+
+    assert [error["index"] for error in errors] == [2, 3, 4]
+    assert [row["param_type_name"] for row in created] == ["ph", "alkalinity", "calcium"]
+    assert all(row["id"] is not None for row in created)
+    assert math.ceil(float(created[1]["value"]) * 10) / 10 == 7.7
+
+    count = params.get_count_by_type(test_db, user.id, aquarium.name)
+    assert count["count"] == 3
+
+    delete_from_db(test_db, user)
+
+
+def test_create_many_checks_aquarium_ids(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    other_user, other_aquarium = save_random_user_and_aquarium(test_db)
+    unknown_id = test_db.scalar(text("SELECT MAX(id) + 1 FROM aquariums"))
+
+    items = [
+        schemas.ParamCreate(aquarium=unknown_id, param_type_name="ph", value=8.1),
+        schemas.ParamCreate(aquarium=other_aquarium.id, param_type_name="ph", value=8.1),
+        schemas.ParamCreate(aquarium=aquarium.id, param_type_name="ph", value=8.2),
+    ]
+    created, errors = params.create_many(test_db, user.id, items)
+    assert errors == [
+        {"index": 0, "detail": f"Aquarium '{unknown_id}' not found"},
+        {"index": 1, "detail": f"Aquarium '{other_aquarium.id}' not found"},
+    ]
+    assert [row["aquarium_id"] for row in created] == [aquarium.id]
+    assert params.get_by_type(test_db, other_user.id, other_aquarium.name) == []
+
+    # nothing valid left, no insert
+    created, errors = params.create_many(test_db, user.id, items[:2])
+    assert created == []
+    assert len(errors) == 2
+
+    delete_from_db(test_db, user)
+    delete_from_db(test_db, other_user)
+
+
+def test_can_stream_export(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    note = 'with "quotes", a \\ backslash and a\nnew line'
+    for i in range(100):
+        params.create(test_db, user.id, aquarium.id, ParamTypes.CALCIUM, 400 + i)
+    params.create(test_db, user.id, aquarium.id, ParamTypes.PH, 8.2, note=note)
+
+    data = b"".join(params.stream_export(user.id, aquarium.name, format="csv"))
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert len(rows) == 101
+    assert rows[-1]["note"] == note
+    assert rows[-1]["aquarium"] == aquarium.name
+
+    data = b"".join(params.stream_export(user.id, aquarium.name, ParamTypes.PH, "ndjson"))
+    rows = [json.loads(line) for line in data.decode().splitlines()]
+    assert len(rows) == 1
+    assert rows[0]["note"] == note
+    assert rows[0]["value"] == 8.2
+
+    chunks = params.stream_export(user.id, aquarium.name, ParamTypes.CALCIUM, "ndjson")
+    data = gzip.decompress(b"".join(gzip_chunks(chunks)))
+    assert len(data.decode().splitlines()) == 100
+
+    delete_from_db(test_db, user)
+
+
+def test_can_import_csv(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    data = "\n".join(
+        [
+            "param_type_name,test_kit_name,value,timestamp,note",
+            "alkalinity,salifert_alkalinity,0.5,2024-01-01T10:00:00,",
+            "alkalinity,,8.5,2024-01-02T10:00:00+02:00,a note",
+            "unknown,,8.5,2024-01-02T10:00:00,",
+            "calcium,,not_a_number,2024-01-02T10:00:00,",
+            "calcium,,420,2024-01-03,",
+            "ph,hanna_nitrate,8.1,2024-01-03,",
+        ]
+    )
+
+    imported, errors, n_errors = params.import_csv(
+        test_db, user.id, aquarium.id, io.BytesIO(data.encode()), chunk_rows=2
+    )
+    assert imported == 3
+    assert n_errors == 3
+    assert [error["line"] for error in errors] == [4, 5, 7]
+    assert errors[-1]["detail"] == "ph and/or hanna_nitrate not supported"
+
+    values = params.get_by_type(test_db, user.id, aquarium.name, ParamTypes.ALKALINITY)
+    assert len(values) == 2
+    assert values[0].note == "a note"
+    assert values[0].timestamp == datetime(2024, 1, 2, 8)
+    assert math.ceil(values[1].value * 10) / 10 == 7.7
+
+    # exported values are already converted
+    exported = b"".join(params.stream_export(user.id, aquarium.name))
+    other_aquarium = save_random_aquarium(test_db, user.id)
+    imported, errors, n_errors = params.import_csv(
+        test_db, user.id, other_aquarium.id, io.BytesIO(exported), convert_value=False
+    )
+    assert imported == 3
+    assert errors == [] and n_errors == 0
+    assert [param.value for param in values] == [
+        param.value
+        for param in params.get_by_type(
+            test_db, user.id, other_aquarium.name, ParamTypes.ALKALINITY
+        )
+    ]
+
+    # only the first errors are kept, all of them are counted
+    garbage = "param_type_name,value,timestamp\n" + "unknown,1,2024-01-01\n" * 1000
+    imported, errors, n_errors = params.import_csv(
+        test_db, user.id, aquarium.id, io.BytesIO(garbage.encode()), max_errors=10
+    )
+    assert imported == 0
+    assert n_errors == 1000
+    assert [error["line"] for error in errors] == list(range(2, 12))
+
+    with pytest.raises(ValueError):
+        params.import_csv(test_db, user.id, aquarium.id, io.BytesIO(b"value\n1"))
+
+    delete_from_db(test_db, user)
+
+
+def test_async_queries_match_sync_queries(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    now_utc = datetime.now(UTC)
+    for i in range(5):
+        params.create(
+            test_db,
+            user.id,
+            aquarium.id,
+            ParamTypes.ALKALINITY,
+            i,
+            now_utc - timedelta(days=i),
+        )
+
+    for kwargs in [{}, {"days": 2}, {"limit": 2, "offset": 1}]:
+        assert run_async(
+            params.get_by_type_async,
+            user.id,
+            aquarium.name,
+            ParamTypes.ALKALINITY,
+            **kwargs,
+        ) == params.get_by_type(
+            test_db, user.id, aquarium.name, ParamTypes.ALKALINITY, **kwargs
+        )
+
+    assert run_async(
+        params.get_count_by_type_async, user.id, aquarium.name, days=2
+    ) == params.get_count_by_type(test_db, user.id, aquarium.name, days=2)
+
+    assert run_async(
+        params.get_summary_by_type_async, user.id, aquarium.name
+    ) == params.get_summary_by_type(test_db, user.id, aquarium.name)
+
+    delete_from_db(test_db, user)
+
+
+def test_columnar_matches_objects(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    now_utc = datetime.now(UTC)
+    params.create(test_db, user.id, aquarium.id, ParamTypes.ALKALINITY, 8.5, now_utc)
+    params.create(
+        test_db, user.id, aquarium.id, ParamTypes.CALCIUM, 420, now_utc - timedelta(days=1)
+    )
+    params.create(
+        test_db, user.id, aquarium.id, ParamTypes.ALKALINITY, 9, now_utc - timedelta(days=2)
+    )
+
+    items = params.get_by_type(test_db, user.id, aquarium.name)
+    columns = params.get_by_type_columnar(test_db, user.id, aquarium.name)
+    assert columns["ids"] == [item.id for item in items]
+    assert columns["values"] == [item.value for item in items]
+    assert columns["timestamps"] == [item.timestamp for item in items]
+    assert columns["param_type_names"] == [item.param_type_name for item in items]
+    for item in items:
+        assert columns["param_types"][item.param_type_name] == {
+            "display_name": item.param_type_display_name,
+            "unit": item.unit,
+        }
+        assert (
+            columns["test_kits"][item.test_kit_name]["display_name"]
+            == item.test_kit_display_name
+        )
+
+    first = params.truncate_param_columns(columns, 1)
+    assert first["ids"] == columns["ids"][:1]
+    assert list(first["param_types"]) == ["alkalinity"]
+
+    empty = params.get_by_type_columnar(test_db, user.id, aquarium.name, "ph")
+    assert empty["ids"] == [] and empty["param_types"] == {}
+
+    delete_from_db(test_db, user)
+
+
+def test_writes_use_one_statement(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+
+    with capture_statements(engine) as statements:
+        param = params.create(test_db, user.id, aquarium.id, ParamTypes.CALCIUM, 420)
+        assert param.id is not None
+        assert param.timestamp.tzinfo is None
+    assert len(statements) == 1
+    assert "RETURNING" in statements[0][0]
+
+    with capture_statements(engine) as statements:
+        updated = params.update_by_id(test_db, user.id, param.id, value=425, note="n")
+        assert updated is param
+        assert float(param.value) == 425
+        assert param.note == "n"
+        assert param.updated_on.tzinfo is None
+    assert len(statements) == 1
+
+    assert params.update_by_id(test_db, user.id, -1, value=1) is None
+
+    delete_from_db(test_db, user)
+
+
+def get_daily_stats(db, user_id: int, table: str) -> list[tuple]:
+    if table == "param_daily_stats":
+        sql = """
+            SELECT aquarium_id, param_type_name, day, count, sum, sum_squares,
+                min, max, last_value, last_timestamp
+            FROM param_daily_stats WHERE user_id = :user_id
+        """
+    else:
+        sql = """
+            SELECT aquarium_id, param_type_name, timestamp::DATE, COUNT(1),
+                SUM(value), SUM(value * value), MIN(value), MAX(value),
+                (ARRAY_AGG(value ORDER BY timestamp DESC, id DESC))[1], MAX(timestamp)
+            FROM param_values WHERE user_id = :user_id
+            GROUP BY aquarium_id, param_type_name, timestamp::DATE
+        """
+    return sorted(tuple(row) for row in db.execute(text(sql), {"user_id": user_id}))
+
+
+def test_daily_stats_follow_writes(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+
+    def assert_rollup_matches():
+        expected = get_daily_stats(test_db, user.id, "param_values")
+        assert get_daily_stats(test_db, user.id, "param_daily_stats") == expected
+        return expected
+
+    first = params.create(
+        test_db, user.id, aquarium.id, "alkalinity", 8.0, datetime(2024, 1, 1, 10)
+    )
+    params.create(
+        test_db, user.id, aquarium.id, "alkalinity", 9.0, datetime(2024, 1, 1, 12)
+    )
+    assert len(assert_rollup_matches()) == 1
+
+    params.create_many(
+        test_db,
+        user.id,
+        [
+            schemas.ParamCreate(
+                aquarium=aquarium.id,
+                param_type_name="calcium",
+                value=400 + i,
+                timestamp=datetime(2024, 1, 1 + i),
+            )
+            for i in range(3)
+        ],
+    )
+    data = "param_type_name,value,timestamp\nalkalinity,7.5,2024-01-02T08:00:00\n"
+    params.import_csv(test_db, user.id, aquarium.id, io.BytesIO(data.encode()))
+    assert len(assert_rollup_matches()) == 5
+
+    params.update_by_id(test_db, user.id, first.id, value=10.0)
+    assert_rollup_matches()
+
+    # moving a reading to another day refreshes both days
+    test_db.execute(
+        text("UPDATE param_values SET timestamp = '2024-01-05' WHERE id = :id"),
+        {"id": first.id},
+    )
+    test_db.commit()
+    assert len(assert_rollup_matches()) == 6
+
+    params.delete_by_id(test_db, user.id, first.id)
+    assert len(assert_rollup_matches()) == 5
+
+    rollup = get_daily_stats(test_db, user.id, "param_daily_stats")
+    assert params.backfill_daily_stats(test_db, user.id) == 5
+    assert get_daily_stats(test_db, user.id, "param_daily_stats") == rollup
+
+    delete_from_db(test_db, user)
+    assert get_daily_stats(test_db, user.id, "param_daily_stats") == []
+
+
+def test_concurrent_imports_of_the_same_days_dont_deadlock(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    lines = [
+        f"alkalinity,8,{datetime(2024, 1, 1) + timedelta(days=i, hours=i % 3)}"
+        for i in range(40)
+    ]
+    barrier = threading.Barrier(2)
+    failures = []
+
+    def import_lines(lines: list[str]):
+        db = SessionLocal()
+        try:
+            data = "param_type_name,value,timestamp\n" + "\n".join(lines)
+            barrier.wait()
+            params.import_csv(
+                db, user.id, aquarium.id, io.BytesIO(data.encode()), chunk_rows=4
+            )
+        except Exception as ex:
+            failures.append(ex)
+        finally:
+            SessionLocal.remove()
+
+    # the same days in opposite orders, several days per COPY statement
+    threads = [
+        threading.Thread(target=import_lines, args=(lines,)),
+        threading.Thread(target=import_lines, args=(lines[::-1],)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+
+    rollup = get_daily_stats(test_db, user.id, "param_daily_stats")
+    assert rollup == get_daily_stats(test_db, user.id, "param_values")
+    assert [row[3] for row in rollup] == [2] * 40
+
+    delete_from_db(test_db, user)
+
+
+def test_can_get_stats_for_several_windows(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    now = datetime.now(UTC)
+    for i in range(0, 100, 3):
+        params.create(
+            test_db,
+            user.id,
+            aquarium.id,
+            "alkalinity",
+            7 + i / 50,
+            now - timedelta(days=i),
+        )
+    params.create(
+        test_db, user.id, aquarium.id, "calcium", 420, now - timedelta(days=60)
+    )
+
+    with capture_statements(engine) as statements:
+        stats = params.get_stats_by_windows(test_db, user.id, aquarium.name)
+    assert len(statements) == 1
+    assert set(stats) == {"alkalinity", "calcium"}
+
+    for n_days in params.STATS_WINDOWS:
+        expected = params.get_stats_by_type_last_n_days(
+            test_db, user.id, aquarium.name, "alkalinity", n_days
+        )
+        window = stats["alkalinity"][n_days]
+        assert window["count"] == expected["count"]
+        assert window["avg"] == pytest.approx(expected["avg"])
+        assert window["std"] == pytest.approx(expected["std"])
+
+        values = [
+            param.value
+            for param in params.get_by_type(
+                test_db, user.id, aquarium.name, "alkalinity"
+            )
+            if param.timestamp.date() >= (now - timedelta(days=n_days)).date()
+        ]
+        assert window["min"] == pytest.approx(min(values))
+        assert window["max"] == pytest.approx(max(values))
+
+    assert stats["calcium"][7] == {
+        "count": 0,
+        "avg": None,
+        "std": None,
+        "min": None,
+        "max": None,
+    }
+    assert stats["calcium"][90]["count"] == 1
+    assert stats["calcium"][90]["std"] is None
+
+    assert run_async(
+        params.get_stats_by_windows_async, user.id, aquarium.name, "calcium", (1, 365)
+    ) == params.get_stats_by_windows(
+        test_db, user.id, aquarium.name, "calcium", (1, 365)
+    )
+
+    delete_from_db(test_db, user)
+
+
+def test_stats_route(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db, verified=True)
+    now = datetime.now(UTC)
+    params.create(
+        test_db, user.id, aquarium.id, "alkalinity", 8, now - timedelta(days=1)
+    )
+    params.create(
+        test_db, user.id, aquarium.id, "calcium", 420, now - timedelta(days=60)
+    )
+    headers = get_auth_headers(user)
+
+    def get_stats(query: str = ""):
+        return client.get(
+            f"/params/stats?aquarium={aquarium.name}{query}", headers=headers
+        )
+
+    with TestClient(app) as client:
+        response = get_stats()
+        assert response.status_code == 200
+        # int window keys are serialized as strings
+        assert response.json() == {
+            "windows": list(params.STATS_WINDOWS),
+            "stats": {
+                param_type: {str(n_days): stats for n_days, stats in windows.items()}
+                for param_type, windows in params.get_stats_by_windows(
+                    test_db, user.id, aquarium.name
+                ).items()
+            },
+        }
+        assert response.json()["stats"]["alkalinity"]["7"]["avg"] == 8
+        assert response.json()["stats"]["calcium"]["7"]["count"] == 0
+
+        response = get_stats("&days=365&days=7&days=7&type=calcium")
+        assert response.status_code == 200
+        assert response.json()["windows"] == [7, 365]
+        assert set(response.json()["stats"]) == {"calcium"}
+        assert response.json()["stats"]["calcium"]["365"]["count"] == 1
+
+        assert get_stats("&days=0&days=3650").status_code == 200
+        for query in [
+            "".join(f"&days={n}" for n in range(1, 7)),
+            "&days=3651",
+            "&days=-1",
+        ]:
+            response = get_stats(query)
+            assert response.status_code == 400
+            assert "At most 5 windows" in response.json()["detail"]
+
+    delete_from_db(test_db, user)
+
+
+def test_params_route_formats(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db, verified=True)
+    for value in [8.0, 8.5, 9.0]:
+        params.create(test_db, user.id, aquarium.id, "alkalinity", value)
+    headers = get_auth_headers(user)
+
+    def get_params(query: str):
+        response = client.get(
+            f"/params/?aquarium={aquarium.name}{query}", headers=headers
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    with TestClient(app) as client:
+        # same bodies as the orjson rendering of the query results
+        assert get_params("") == json.loads(
+            dumps(params.get_by_type(test_db, user.id, aquarium.name))
+        )
+        columns = params.get_by_type_columnar(test_db, user.id, aquarium.name)
+        assert get_params("&format=columnar") == json.loads(dumps(columns))
+
+        page = get_params("&cursor=&limit=2")
+        assert [item["value"] for item in page["items"]] == [9.0, 8.5]
+        assert page["next_cursor"] is not None
+        page = get_params("&format=columnar&cursor=&limit=2")
+        assert page["values"] == [9.0, 8.5]
+        assert page["param_types"] == json.loads(dumps(columns["param_types"]))
+        page = get_params(f"&format=columnar&cursor={page['next_cursor']}&limit=2")
+        assert page["values"] == [8.0]
+        assert page["next_cursor"] is None
+
+        # documented, the routes return data rather than responses
+        paths = client.get("/openapi.json").json()["paths"]
+        for path, schema in [
+            ("/params/stats", "ParamStats"),
+            ("/params/series", "ParamSeries"),
+        ]:
+            assert paths[path]["get"]["responses"]["200"]["content"][
+                "application/json"
+            ]["schema"] == {"$ref": f"#/components/schemas/{schema}"}
+        assert "anyOf" in (
+            paths["/params/"]["get"]["responses"]["200"]["content"][
+                "application/json"
+            ]["schema"]
+        )
+
+    delete_from_db(test_db, user)
+
+
+def test_sync_routes_authenticate_with_their_session(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db, verified=True)
+    headers = get_auth_headers(user)
+    async_checkouts = []
+
+    def on_checkout(*args):
+        async_checkouts.append(args)
+
+    # not cached, the route reads the user from the db
+    users.invalidate_cache(email=user.email)
+    event.listen(async_engine.sync_engine, "checkout", on_checkout)
+    try:
+        with TestClient(app) as client:
+            response = client.post(
+                "/params",
+                json={"aquarium": aquarium.id, "param_type_name": "ph", "value": 8.1},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            assert async_checkouts == []
+
+            response = client.get(f"/params/{response.json()['id']}", headers=headers)
+            assert response.status_code == 200
+            assert response.json()["value"] == 8.1
+    finally:
+        event.remove(async_engine.sync_engine, "checkout", on_checkout)
+
+    delete_from_db(test_db, user)
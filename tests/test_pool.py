@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+from logreef.config import get_config, ConfigAPI
+from logreef.persistence.database import get_engine_options
+from logreef.persistence.pool import TimedQueuePool, TimedAsyncQueuePool, get_pool_stats
+
+
+def test_engine_options_from_config(monkeypatch):
+    monkeypatch.setenv(ConfigAPI.DB_POOL_SIZE.value, "3")
+    monkeypatch.setenv(ConfigAPI.DB_MAX_OVERFLOW.value, "1")
+    monkeypatch.setenv(ConfigAPI.DB_POOL_PRE_PING.value, "true")
+    monkeypatch.setenv(ConfigAPI.DB_STATEMENT_TIMEOUT_MS.value, "5000")
+
+    options = get_engine_options()
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 3
+    assert options["max_overflow"] == 1
+    assert options["pool_pre_ping"]
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    options = get_engine_options(is_async=True)
+    assert options["poolclass"] is TimedAsyncQueuePool
+    assert options["connect_args"] == {
+        "server_settings": {"statement_timeout": "5000"}
+    }
+
+
+def test_engine_options_pgbouncer(monkeypatch):
+    monkeypatch.setenv(ConfigAPI.DB_PGBOUNCER.value, "1")
+    monkeypatch.setenv(ConfigAPI.DB_STATEMENT_TIMEOUT_MS.value, "5000")
+
+    options = get_engine_options()
+    assert options["poolclass"] is NullPool
+    assert "connect_args" not in options
+
+    options = get_engine_options(is_async=True)
+    assert options["connect_args"] == {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+    }
+
+
+def test_statement_timeout_applied(monkeypatch):
+    monkeypatch.setenv(ConfigAPI.DB_STATEMENT_TIMEOUT_MS.value, "50")
+    engine = create_engine(get_config(ConfigAPI.DB_URL), **get_engine_options())
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT pg_sleep(1)"))
+    finally:
+        engine.dispose()
+
+
+def test_pool_stats_record_checkouts_and_timeouts():
+    engine = create_engine(
+        get_config(ConfigAPI.DB_URL),
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    try:
+        with engine.connect():
+            stats = get_pool_stats(engine.pool)
+            assert stats["checked_out"] == 1
+            assert stats["overflow"] == 0
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        engine.dispose()
+        stats = get_pool_stats(engine.pool)
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 100
+    finally:
+        engine.dispose()
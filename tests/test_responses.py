@@ -0,0 +1,47 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from logreef import schemas
+from logreef.config import ParamTypes
+from logreef.persistence import params
+from logreef.persistence.database import delete_from_db
+from logreef.responses import dumps
+from .helpers import save_random_user_and_aquarium
+
+
+def assert_same_json(content):
+    assert json.loads(dumps(content)) == json.loads(
+        json.dumps(jsonable_encoder(content))
+    )
+
+
+def test_dumps_matches_jsonable_encoder(test_db):
+    now = datetime.now(timezone.utc)
+    assert_same_json(
+        {
+            "decimals": [Decimal("8.5"), Decimal("12"), Decimal("1E+2")],
+            "aware": now,
+            "naive": now.replace(tzinfo=None, microsecond=0),
+            "none": None,
+        }
+    )
+
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    param = params.create(test_db, user.id, aquarium.id, ParamTypes.ALKALINITY, 8.5)
+    items = params.get_by_type(test_db, user.id, aquarium.name)
+    assert_same_json(param)
+    assert_same_json(aquarium)
+    assert_same_json(items)
+    assert_same_json(schemas.ParamPage(items=items, next_cursor=None))
+    assert_same_json(params.get_by_type_columnar(test_db, user.id, aquarium.name))
+
+    delete_from_db(test_db, user)
+
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
@@ -0,0 +1,64 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from jose import JWTError
+
+from logreef import security
+from logreef.security import (
+    create_access_token,
+    get_payload_from_token,
+    token_cache,
+    hash_password,
+    verify_password,
+    PasswordPoolSaturated,
+)
+
+
+def test_token_payload_is_cached():
+    token, _ = create_access_token({"email": "cache@thelogreef.com"})
+    hits = token_cache.stats()["hits"]
+
+    payload = get_payload_from_token(token)
+    assert payload["email"] == "cache@thelogreef.com"
+    assert get_payload_from_token(token) is payload
+    assert token_cache.stats()["hits"] == hits + 1
+
+
+def test_tampered_token_is_not_served_from_cache():
+    token, _ = create_access_token({"email": "cache@thelogreef.com"})
+    get_payload_from_token(token)
+
+    header, payload, signature = token.split(".")
+    with pytest.raises(JWTError):
+        get_payload_from_token(".".join([header, payload, signature[::-1]]))
+
+
+def test_cached_token_expires():
+    token, _ = create_access_token(
+        {"email": "cache@thelogreef.com"}, expires_delta=timedelta(seconds=1)
+    )
+    assert get_payload_from_token(token)["email"] == "cache@thelogreef.com"
+
+    time.sleep(2)
+    with pytest.raises(JWTError):
+        get_payload_from_token(token)
+
+
+def test_can_hash_and_verify_password_in_pool():
+    hashed = hash_password("password")
+    assert verify_password("password", hashed)
+    assert not verify_password("wrong", hashed)
+
+
+def test_password_pool_rejects_when_saturated(monkeypatch):
+    monkeypatch.setattr(security, "PASSWORD_POOL_WORKERS", 1)
+    monkeypatch.setattr(security, "_password_slots", threading.BoundedSemaphore(1))
+    security._password_slots.acquire()
+
+    with pytest.raises(PasswordPoolSaturated):
+        hash_password("password")
+
+    security._password_slots.release()
+    assert hash_password("password")
@@ -0,0 +1,97 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from logreef import schemas
+from logreef.series import lttb, get_downsampled
+from logreef.persistence.database import delete_from_db
+from logreef.persistence import params
+from .helpers import save_random_user_and_aquarium
+
+
+def test_lttb_keeps_first_last_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[250] = 10
+    y[700] = -10
+
+    kept = lttb(x, y, 20)
+    assert len(kept) == 20
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 250 in kept
+    assert 700 in kept
+
+
+def test_lttb_returns_all_points_when_fewer_than_requested():
+    x = np.arange(5, dtype=np.float64)
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        lttb(x, x, 2)
+
+
+def test_can_get_series_buckets(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    day = datetime.datetime(2024, 3, 4, 8)
+    for hours, value in [(0, 8.0), (2, 9.0), (4, 8.5), (24, 7.0)]:
+        params.create(
+            test_db,
+            user.id,
+            aquarium.id,
+            "alkalinity",
+            value,
+            timestamp=day + datetime.timedelta(hours=hours),
+        )
+
+    buckets = params.get_series_buckets(
+        test_db, user.id, aquarium.name, "alkalinity", "day"
+    )
+    assert len(buckets) == 2
+    assert buckets[0]["timestamp"] == datetime.datetime(2024, 3, 4)
+    assert buckets[0]["min"] == 8.0
+    assert buckets[0]["max"] == 9.0
+    assert buckets[0]["avg"] == pytest.approx(8.5)
+    assert buckets[0]["last"] == 8.5
+    assert buckets[0]["count"] == 3
+    assert buckets[1]["count"] == 1
+
+    buckets = params.get_series_buckets(
+        test_db, user.id, aquarium.name, "alkalinity", "month"
+    )
+    assert len(buckets) == 1
+    assert buckets[0]["count"] == 4
+
+    with pytest.raises(ValueError):
+        params.get_series_buckets(test_db, user.id, aquarium.name, "alkalinity", "hour")
+
+    delete_from_db(test_db, user)
+
+
+def test_can_get_downsampled_series(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    start = datetime.datetime(2024, 1, 1)
+    params.create_many(
+        test_db,
+        user.id,
+        [
+            schemas.ParamCreate(
+                aquarium=aquarium.id,
+                param_type_name="calcium",
+                value=420 + (i % 7),
+                timestamp=start + datetime.timedelta(hours=i),
+            )
+            for i in range(200)
+        ],
+    )
+
+    points = get_downsampled(test_db, user.id, aquarium.name, "calcium", 50)
+    assert len(points) == 50
+    assert points[0]["timestamp"] == start
+    assert points[-1]["timestamp"] == start + datetime.timedelta(hours=199)
+    timestamps = [point["timestamp"] for point in points]
+    assert timestamps == sorted(timestamps)
+
+    assert get_downsampled(test_db, user.id, aquarium.name, "ph", 50) == []
+
+    delete_from_db(test_db, user)
@@ -1,11 +1,21 @@
 import datetime
+import random
+import time
 
 import pytest
 
-from logreef.summary import get_by_type, get_for_all
-from logreef.persistence.database import delete_from_db
+from logreef import schemas
+from logreef.summary import (
+    MONTH_DAYS,
+    WEEK_DAYS,
+    _cache_key,
+    get_by_type,
+    get_for_all,
+)
+from logreef.persistence.database import add_to_db, delete_from_db, engine
 from logreef.persistence import params
 from .helpers import (
+    capture_statements,
     save_random_aquarium,
     save_random_user,
     save_random_user_and_aquarium,
@@ -81,3 +91,195 @@ def test_can_get_summary_for_type(test_db):
     assert summary["count_last_week"] == 1
 
     delete_from_db(test_db, user)
+
+
+def test_summary_for_all_types_matches_per_type_queries(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    for i in range(10):
+        ts = now - datetime.timedelta(days=i)
+        params.create(test_db, user.id, aquarium.id, "alkalinity", 8 + i / 10, ts)
+        params.create(test_db, user.id, aquarium.id, "calcium", 400 + i, ts)
+
+    info = get_for_all(test_db, user.id, aquarium.name)
+    assert set(info.keys()) == {"alkalinity", "calcium"}
+
+    for param_type in ["alkalinity", "calcium"]:
+        last_params = params.get_by_type(
+            test_db, user.id, aquarium.name, param_type, limit=2
+        )
+        stats = params.get_stats_by_type_last_n_days(
+            test_db, user.id, aquarium.name, param_type, 7
+        )
+        assert info[param_type]["ids"] == [param.id for param in last_params]
+        assert info[param_type]["values"] == [param.value for param in last_params]
+        assert info[param_type]["count_last_week"] == stats["count"]
+        assert info[param_type]["avg_last_week"] == pytest.approx(stats["avg"])
+        assert info[param_type]["std_last_week"] == pytest.approx(stats["std"])
+
+    delete_from_db(test_db, user)
+
+
+def test_summary_for_type_without_values(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+
+    summary = get_by_type(test_db, user.id, aquarium.name, "calcium")
+    assert summary["values"] == []
+    assert summary["count_last_week"] == 0
+    assert summary["avg_last_week"] is None
+
+    delete_from_db(test_db, user)
+
+
+def test_summary_is_cached_until_params_change(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    param = params.create(test_db, user.id, aquarium.id, "alkalinity", 8.0)
+
+    first = get_for_all(test_db, user.id, aquarium.name)
+    with capture_statements(engine) as statements:
+        time.sleep(0.01)
+        cached = get_for_all(test_db, user.id, aquarium.name)
+        by_type = get_by_type(test_db, user.id, aquarium.name, "alkalinity")
+    assert statements == []
+    assert cached["alkalinity"]["ids"] == [param.id]
+    # recomputed from the cached timestamps
+    assert (
+        cached["alkalinity"]["time_since_secs"][0]
+        > first["alkalinity"]["time_since_secs"][0]
+    )
+    assert by_type["values"] == cached["alkalinity"]["values"]
+
+    created = params.create(test_db, user.id, aquarium.id, "alkalinity", 9.0)
+    assert get_for_all(test_db, user.id, aquarium.name)["alkalinity"]["ids"] == [
+        created.id,
+        param.id,
+    ]
+
+    params.update_by_id(test_db, user.id, created.id, value=10.0)
+    assert get_for_all(test_db, user.id, aquarium.name)["alkalinity"]["values"][0] == 10
+
+    params.delete_by_id(test_db, user.id, created.id)
+    assert get_for_all(test_db, user.id, aquarium.name)["alkalinity"]["ids"] == [
+        param.id
+    ]
+
+    # not written yet, the caller invalidates once it commits the row
+    pending = params.create(
+        test_db, user.id, aquarium.id, "alkalinity", 7.0, commit=False
+    )
+    with capture_statements(engine) as statements:
+        get_for_all(test_db, user.id, aquarium.name)
+    assert statements == []
+    pending = add_to_db(test_db, pending)
+    params.invalidate_summaries(user.id)
+    assert get_for_all(test_db, user.id, aquarium.name)["alkalinity"]["ids"][0] == (
+        pending.id
+    )
+
+    params.create_many(
+        test_db,
+        user.id,
+        [
+            schemas.ParamCreate(
+                aquarium=aquarium.id, param_type_name="calcium", value=420
+            )
+        ],
+    )
+    assert "calcium" in get_for_all(test_db, user.id, aquarium.name)
+
+    delete_from_db(test_db, user)
+
+
+def test_summary_queried_before_a_write_isnt_cached(test_db, monkeypatch):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    param = params.create(test_db, user.id, aquarium.id, "alkalinity", 8.0)
+    get_summary_by_type = params.get_summary_by_type
+
+    def get_summary_then_write(*args, **kwargs):
+        # the write commits and invalidates after the query read the old rows
+        results = get_summary_by_type(*args, **kwargs)
+        params.create(test_db, user.id, aquarium.id, "alkalinity", 9.0)
+        return results
+
+    monkeypatch.setattr(params, "get_summary_by_type", get_summary_then_write)
+    assert get_for_all(test_db, user.id, aquarium.name)["alkalinity"]["ids"] == [
+        param.id
+    ]
+    monkeypatch.setattr(params, "get_summary_by_type", get_summary_by_type)
+
+    assert params.summary_cache.get(_cache_key(user.id, aquarium.name)) is None
+    assert get_for_all(test_db, user.id, aquarium.name)["alkalinity"]["values"] == [
+        9.0,
+        8.0,
+    ]
+
+    delete_from_db(test_db, user)
+
+
+def time_weighted_stats_loop(times, values, start, end):
+    # reference: walk the readings, each one holds until the next
+    covered = []
+    for i, (time, value) in enumerate(zip(times, values)):
+        until = times[i + 1] if i + 1 < len(times) else end
+        duration = min(until, end) - max(time, start)
+        if duration > 0:
+            covered.append((duration, value))
+    total = sum(duration for duration, _ in covered)
+    if total == 0:
+        return None, None
+    mean = sum(duration * value for duration, value in covered) / total
+    variance = sum(duration * (value - mean) ** 2 for duration, value in covered)
+    return mean, (variance / total) ** 0.5
+
+
+def test_summary_has_time_weighted_stats(test_db):
+    user, aquarium = save_random_user_and_aquarium(test_db)
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    rng = random.Random(0)
+    readings = {
+        # before the month, in effect at its start
+        "calcium": [(40, 400), (10, 430), (2, 420)],
+        "alkalinity": [(rng.uniform(0, 45), rng.uniform(7, 9)) for _ in range(50)],
+        # only one reading, before both windows
+        "magnesium": [(60, 1350)],
+    }
+    for param_type, values in readings.items():
+        for days, value in values:
+            params.create(
+                test_db,
+                user.id,
+                aquarium.id,
+                param_type,
+                value,
+                now - datetime.timedelta(days=days),
+            )
+
+    by_type = {
+        param_type: get_by_type(test_db, user.id, aquarium.name, param_type)
+        for param_type in readings
+    }
+    for_all = get_for_all(test_db, user.id, aquarium.name)
+    end = time.time()
+
+    today = datetime.datetime.combine(now.date(), datetime.time(), datetime.UTC)
+    for param_type, values in readings.items():
+        values = sorted(values, reverse=True)
+        times = [
+            (now - datetime.timedelta(days=days)).replace(tzinfo=datetime.UTC).timestamp()
+            for days, _ in values
+        ]
+        for name, days in [("week", WEEK_DAYS), ("month", MONTH_DAYS)]:
+            start = (today - datetime.timedelta(days=days)).timestamp()
+            mean, std = time_weighted_stats_loop(
+                times, [value for _, value in values], start, end
+            )
+            for summary in [by_type[param_type], for_all[param_type]]:
+                assert summary[f"time_avg_last_{name}"] == pytest.approx(mean)
+                assert summary[f"time_std_last_{name}"] == pytest.approx(
+                    std, rel=1e-4, abs=1e-6
+                )
+
+    assert for_all["magnesium"]["time_avg_last_week"] == pytest.approx(1350)
+    assert for_all["magnesium"]["time_std_last_week"] == 0
+
+    delete_from_db(test_db, user)